@@ -7,24 +7,29 @@ Usage:
     python add_group.py --list  (pour voir les groupes configurés)
 """
 
-import json
+import os
 import sys
 from pathlib import Path
 
+from json_utils import dumps_json, loads_json
+
 CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'groups.json'
 
 
 def load_config():
     if CONFIG_PATH.exists():
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return loads_json(CONFIG_PATH.read_bytes())
     return {"groups": [], "settings": {"posts_per_group": 50}}
 
 
 def save_config(config):
-    CONFIG_PATH.parent.mkdir(exist_ok=True)
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    if not CONFIG_PATH.parent.exists():
+        CONFIG_PATH.parent.mkdir(parents=True)
+    
+    # Écriture atomique: l'API et le scraper lisent groups.json pendant qu'on l'écrit
+    tmp_path = CONFIG_PATH.with_name(CONFIG_PATH.name + '.tmp')
+    tmp_path.write_bytes(dumps_json(config))
+    os.replace(tmp_path, CONFIG_PATH)
 
 
 def add_group(name: str, url: str):
@@ -6,14 +6,28 @@ Lit les fichiers JSON extraits par l'extension Chrome et filtre les posts
 contenant des mots-clés pertinents pour identifier des freelances/créateurs.
 """
 
-import json
 import sys
 import os
 import re
+import multiprocessing
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache, partial
+from itertools import islice
 from typing import Optional
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Repli sur une regex combinée (pip install pyahocorasick)
+
+from json_utils import dumps_json, loads_json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None  # Repli sur un chargement complet du fichier (pip install ijson)
+
 # Mots-clés à rechercher
 KEYWORDS = [
     # Français - Médias
@@ -68,61 +82,207 @@ class Colors:
     END = '\033[0m'
 
 
-def find_latest_json(tmp_dir: Path) -> Optional[Path]:
-    """Trouve le fichier JSON le plus récent dans .tmp/"""
-    json_files = list(tmp_dir.glob("facebook_posts_*.json"))
+# Pas de codes ANSI quand la sortie est redirigée (fichier, pipe, logs) ou si NO_COLOR est défini
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for name in [name for name in vars(Colors) if name.isupper()]:
+        setattr(Colors, name, '')
+
+
+# Au-delà de ce nombre de textes, l'analyse est répartie sur tous les cœurs
+# (en dessous, démarrer les processus coûte plus cher que l'analyse elle-même)
+PARALLEL_MIN_POSTS = 2000
+
+# Nombre de posts gardés en mémoire à la fois quand le fichier est lu en flux (ijson)
+STREAM_BATCH_SIZE = 10000
+
+# Regex pré-compilées pour le cas spécial "IA" (évite "j'ai", "avait", etc.)
+IA_PATTERN = re.compile(r'(?:^|[^a-zéèêë])ia(?:[^a-zéèêë]|$)')
+JAI_PATTERN = re.compile(r"[jntl]'ia")
+
+
+@lru_cache(maxsize=32)
+def compile_keyword_scanner(keywords: tuple) -> tuple:
+    """
+    Prépare le scan de tous les mots-clés en un seul passage sur le texte
+    
+    Utilise un automate Aho-Corasick si pyahocorasick est installé, sinon
+    une seule regex (alternation) accompagnée de l'ensemble des mots-clés.
+    
+    Returns:
+        (scanner, [(mot-clé en minuscules, mot-clé original), ...]) - la liste
+        garde l'ordre de `keywords`, le cas spécial IA y est marqué par None
+    """
+    ordered = []
+    alternatives = []
+    for keyword in keywords:
+        if keyword.strip() == "IA":
+            ordered.append((None, "IA"))
+        else:
+            ordered.append((keyword.lower(), keyword))
+            alternatives.append(keyword.lower())
     
-    if not json_files:
-        return None
+    if not alternatives:
+        return None, ordered
     
-    # Trier par date de modification (plus récent en premier)
-    json_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    return json_files[0]
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword_lower in alternatives:
+            automaton.add_word(keyword_lower, keyword_lower)
+        automaton.make_automaton()
+        return automaton, ordered
+    
+    # Les plus longs d'abord ("content creator" avant un éventuel "content"),
+    # et lookahead pour aussi trouver les mots-clés qui se chevauchent
+    alternatives.sort(key=len, reverse=True)
+    pattern = re.compile(r'(?=\b(' + '|'.join(re.escape(k) for k in alternatives) + r')\b)')
+    return (pattern, frozenset(alternatives)), ordered
+
+
+def is_word_boundary(text: str, index: int) -> bool:
+    """Équivalent de \\b : un seul des deux caractères autour de `index` est alphanumérique"""
+    before = index > 0 and (text[index - 1].isalnum() or text[index - 1] == '_')
+    after = index < len(text) and (text[index].isalnum() or text[index] == '_')
+    return before != after
+
+
+def scan_keywords(scanner, text_lower: str) -> set:
+    """Retourne les mots-clés (en minuscules) trouvés comme mots entiers"""
+    if scanner is None:
+        return set()
+    
+    hits = set()
+    if isinstance(scanner, tuple):
+        pattern, alternatives = scanner
+        for match in pattern.finditer(text_lower):
+            start = match.start()
+            keyword_lower = match.group(1)
+            hits.add(keyword_lower)
+            # Le lookahead ne garde que le plus long mot-clé à cette position: ajouter les plus
+            # courts qui en sont des préfixes ("site" dans "site web"), comme Aho-Corasick
+            for length in range(1, len(keyword_lower)):
+                if keyword_lower[:length] in alternatives and is_word_boundary(text_lower, start + length):
+                    hits.add(keyword_lower[:length])
+        return hits
+    
+    for end, keyword_lower in scanner.iter(text_lower):
+        start = end - len(keyword_lower) + 1
+        # Filtre de frontière de mot pour garder la sémantique de \b
+        if is_word_boundary(text_lower, start) and is_word_boundary(text_lower, end + 1):
+            hits.add(keyword_lower)
+    return hits
+
+
+@lru_cache(maxsize=32)
+def compile_highlight_pattern(keywords: tuple) -> re.Pattern:
+    """Compile une seule regex qui matche n'importe lequel des mots-clés (les plus longs d'abord)"""
+    # Les plus longs d'abord: "content creator" est surligné en entier plutôt que "content" seul
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile(r'(\b(?:' + '|'.join(re.escape(k) for k in ordered) + r')\b)', re.IGNORECASE)
+
+
+# Pré-compiler les mots-clés par défaut une seule fois, au chargement du module
+# (gardé à part: pas de tuple(keywords) ni de hash à chaque post pour le cas courant)
+DEFAULT_SCANNER = compile_keyword_scanner(tuple(KEYWORDS))
+
+
+def find_latest_json(tmp_dir: Path) -> Optional[Path]:
+    """Trouve le fichier JSON le plus récent dans .tmp/"""
+    # Le plus récent par date de modification (None si aucun fichier)
+    return max(tmp_dir.glob("facebook_posts_*.json"), key=lambda x: x.stat().st_mtime, default=None)
 
 
 def load_posts(file_path: Path) -> dict:
     """Charge les posts depuis un fichier JSON"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return loads_json(Path(file_path).read_bytes())
+
+
+def iter_posts(file_path: Path):
+    """Lit les posts un par un, sans charger tout le fichier en mémoire (nécessite ijson)"""
+    with open(file_path, 'rb') as f:
+        yield from ijson.items(f, 'posts.item', use_float=True)
+
 
+def load_metadata(file_path: Path) -> dict:
+    """Lit les champs simples de premier niveau (groupName, extractedAt...) sans garder les posts"""
+    metadata = {}
+    with open(file_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix and '.' not in prefix and event in ('string', 'number', 'boolean', 'null'):
+                metadata[prefix] = value
+    return metadata
 
-def find_keywords_in_text(text: str, keywords: list) -> list:
+
+def find_keywords_in_text(text: str, keywords: list = KEYWORDS) -> list:
     """Trouve tous les mots-clés présents dans le texte"""
     if not text:
         return []
     
-    # Ajouter des espaces au début et fin pour matcher " IA "
-    text_with_spaces = f" {text} "
-    text_lower = text_with_spaces.lower()
+    # Une seule copie en minuscules (IA_PATTERN gère le début et la fin du texte)
+    text_lower = text.lower()
+    
+    # Un seul passage sur le texte pour tous les mots-clés
+    if keywords is KEYWORDS:
+        scanner, ordered = DEFAULT_SCANNER
+    else:
+        scanner, ordered = compile_keyword_scanner(tuple(keywords))
+    hits = scan_keywords(scanner, text_lower)
     found = []
     
-    for keyword in keywords:
-        keyword_lower = keyword.lower()
-        
-        # Cas spécial: " IA " - chercher exactement avec espaces (case insensitive mais mot isolé)
-        if keyword.strip() == "IA":
-            # Chercher IA comme mot isolé, pas dans "j'ai", "avait", etc.
-            if re.search(r'[^a-zéèêë]ia[^a-zéèêë]', text_lower):
-                # Vérifier que ce n'est pas "j'ai" ou similaire
-                if not re.search(r"[jntl]'ia", text_lower):
-                    found.append("IA")
-            continue
-        
-        # Cas normal: utilise une regex pour matcher le mot entier
-        pattern = r'\b' + re.escape(keyword_lower) + r'\b'
-        if re.search(pattern, text_lower):
+    for keyword_lower, keyword in ordered:
+        # Cas spécial: " IA " - chercher IA comme mot isolé, pas dans "j'ai", "avait", etc.
+        if keyword_lower is None:
+            # Vérifier que ce n'est pas "j'ai" ou similaire
+            if IA_PATTERN.search(text_lower) and not JAI_PATTERN.search(text_lower):
+                found.append("IA")
+        elif keyword_lower in hits:
             found.append(keyword)
     
     return found
 
 
+def find_keywords_by_text(texts: list, keywords: list) -> dict:
+    """Mots-clés trouvés pour chaque texte (sur tous les cœurs s'il y a beaucoup de textes)"""
+    if len(texts) < PARALLEL_MIN_POSTS or (os.cpu_count() or 1) < 2:
+        return {text: find_keywords_in_text(text, keywords) for text in texts}
+    
+    # Mots-clés par défaut: ne pas les envoyer aux processus, qui utilisent leur propre KEYWORDS
+    worker = find_keywords_in_text if keywords is KEYWORDS else partial(find_keywords_in_text, keywords=keywords)
+    with multiprocessing.Pool() as pool:
+        found = pool.imap(worker, texts, chunksize=64)
+        return dict(zip(texts, found))
+
+
 def analyze_posts(data: dict, keywords: list = KEYWORDS) -> list:
     """Analyse les posts et retourne ceux qui matchent les mots-clés"""
+    return match_posts(data.get('posts', []), keywords)
+
+
+def analyze_posts_stream(posts, keywords: list = KEYWORDS) -> tuple:
+    """Analyse un flux de posts par lots de STREAM_BATCH_SIZE (retourne les posts qui matchent et le total)"""
     matching_posts = []
+    total_posts = 0
+    posts = iter(posts)
     
-    for post in data.get('posts', []):
-        text = post.get('text', '')
-        found_keywords = find_keywords_in_text(text, keywords)
+    while True:
+        batch = list(islice(posts, STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        total_posts += len(batch)
+        matching_posts.extend(match_posts(batch, keywords))
+    
+    return matching_posts, total_posts
+
+
+def match_posts(posts: list, keywords: list) -> list:
+    """Retourne les posts de la liste qui contiennent des mots-clés (avec `matched_keywords`)"""
+    matching_posts = []
+    
+    # Les posts partagés dans plusieurs groupes ont le même texte: chaque texte n'est analysé qu'une fois
+    texts = list(dict.fromkeys(post.get('text', '') for post in posts))
+    found_by_text = find_keywords_by_text(texts, keywords)
+    
+    for post in posts:
+        found_keywords = found_by_text[post.get('text', '')]
         
         if found_keywords:
             matching_posts.append({
@@ -138,11 +298,11 @@ def highlight_keywords(text: str, keywords: list) -> str:
     if not text:
         return ""
     
-    for keyword in keywords:
-        pattern = re.compile(r'(\b' + re.escape(keyword) + r'\b)', re.IGNORECASE)
-        text = pattern.sub(f'{Colors.YELLOW}{Colors.BOLD}\\1{Colors.END}', text)
+    if not keywords or not Colors.YELLOW:
+        return text
     
-    return text
+    pattern = compile_highlight_pattern(tuple(keywords))
+    return pattern.sub(f'{Colors.YELLOW}{Colors.BOLD}\\1{Colors.END}', text)
 
 
 def truncate_text(text: str, max_length: int = 300) -> str:
@@ -154,10 +314,8 @@ def truncate_text(text: str, max_length: int = 300) -> str:
     return text[:max_length] + "..."
 
 
-def print_results(matching_posts: list, data: dict):
+def print_results(matching_posts: list, data: dict, total_posts: int):
     """Affiche les résultats de manière formatée"""
-    total_posts = len(data.get('posts', []))
-    
     print(f"\n{Colors.HEADER}{'='*60}{Colors.END}")
     print(f"{Colors.BOLD}📊 ANALYSE DES POSTS FACEBOOK{Colors.END}")
     print(f"{Colors.HEADER}{'='*60}{Colors.END}")
@@ -186,43 +344,47 @@ def print_results(matching_posts: list, data: dict):
     print(f"{Colors.HEADER}{'='*60}{Colors.END}")
     
     for i, post in enumerate(matching_posts, 1):
-        print(f"\n{Colors.BLUE}━━━ Post #{i} ━━━{Colors.END}")
-        print(f"{Colors.BOLD}👤 Auteur:{Colors.END} {post.get('author', 'Inconnu')}")
+        # Un seul write par post au lieu d'un print par ligne
+        lines = [
+            f"\n{Colors.BLUE}━━━ Post #{i} ━━━{Colors.END}",
+            f"{Colors.BOLD}👤 Auteur:{Colors.END} {post.get('author', 'Inconnu')}",
+        ]
         
-        if post.get('date') or post.get('dateRelative'):
-            date_str = post.get('date') or post.get('dateRelative')
-            print(f"{Colors.BOLD}📅 Date:{Colors.END} {date_str}")
+        date_str = post.get('date') or post.get('dateRelative')
+        if date_str:
+            lines.append(f"{Colors.BOLD}📅 Date:{Colors.END} {date_str}")
         
-        print(f"{Colors.BOLD}🏷️  Mots-clés:{Colors.END} {', '.join(post.get('matched_keywords', []))}")
+        lines.append(f"{Colors.BOLD}🏷️  Mots-clés:{Colors.END} {', '.join(post.get('matched_keywords', []))}")
         
         # Afficher le texte avec mots-clés en surbrillance
         text = post.get('text', '')
         highlighted = highlight_keywords(truncate_text(text, 400), post.get('matched_keywords', []))
-        print(f"{Colors.BOLD}💬 Contenu:{Colors.END}\n   {highlighted}")
+        lines.append(f"{Colors.BOLD}💬 Contenu:{Colors.END}\n   {highlighted}")
         
         if post.get('postUrl'):
-            print(f"{Colors.BOLD}🔗 Lien:{Colors.END} {post.get('postUrl')}")
+            lines.append(f"{Colors.BOLD}🔗 Lien:{Colors.END} {post.get('postUrl')}")
         
         if post.get('authorProfileUrl'):
-            print(f"{Colors.BOLD}👤 Profil:{Colors.END} {post.get('authorProfileUrl')}")
-
+            lines.append(f"{Colors.BOLD}👤 Profil:{Colors.END} {post.get('authorProfileUrl')}")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
 
-def save_results(matching_posts: list, data: dict, output_path: Path):
+def save_results(matching_posts: list, data: dict, output_path: Path, total_posts: int):
     """Sauvegarde les résultats dans un fichier JSON"""
     results = {
         'analyzedAt': datetime.now().isoformat(),
         'sourceFile': str(output_path),
         'groupName': data.get('groupName'),
         'groupUrl': data.get('groupUrl'),
-        'totalPosts': len(data.get('posts', [])),
+        'totalPosts': total_posts,
         'matchingPosts': len(matching_posts),
         'keywordsUsed': KEYWORDS,
         'posts': matching_posts
     }
     
     output_file = output_path.parent / f"analyzed_{output_path.name}"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(dumps_json(results))
     
     print(f"\n{Colors.GREEN}✅ Résultats sauvegardés: {output_file}{Colors.END}")
     return output_file
@@ -254,16 +416,20 @@ def main():
     
     print(f"{Colors.CYAN}📂 Analyse du fichier: {input_file}{Colors.END}")
     
-    # Charger et analyser
-    data = load_posts(input_file)
-    matching_posts = analyze_posts(data)
+    # Charger et analyser (en flux si ijson est installé, pour les très gros fichiers)
+    if ijson is not None:
+        data = load_metadata(input_file)
+        matching_posts, total_posts = analyze_posts_stream(iter_posts(input_file))
+    else:
+        data = load_posts(input_file)
+        matching_posts, total_posts = analyze_posts_stream(data.get('posts', []))
     
     # Afficher les résultats
-    print_results(matching_posts, data)
+    print_results(matching_posts, data, total_posts)
     
     # Sauvegarder les résultats
     if matching_posts:
-        save_results(matching_posts, data, input_file)
+        save_results(matching_posts, data, input_file, total_posts)
 
 
 if __name__ == '__main__':
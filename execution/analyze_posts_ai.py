@@ -4,17 +4,36 @@ analyze_posts_ai.py - Analyse les posts Facebook avec OpenAI
 
 Utilise GPT-4o-mini pour comprendre le CONTEXTE des posts et identifier
 les opportunités (quelqu'un qui cherche un freelance/prestataire).
+
+Usage:
+    python analyze_posts_ai.py                   # Fichier le plus récent dans .tmp/
+    python analyze_posts_ai.py fichier.json
+    python analyze_posts_ai.py fichier.json --batch  # Batch API (moins cher, différé)
 """
 
+import asyncio
+import hashlib
 import json
 import sys
 import os
 import re
+import time
+import argparse
+import shelve
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from analyze_posts import KEYWORDS
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Repli sur une regex combinée (pip install pyahocorasick)
+
+from json_utils import dumps_json, loads_json
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -31,6 +50,12 @@ class Colors:
     END = '\033[0m'
 
 
+# Pas de codes ANSI quand la sortie est redirigée (fichier, pipe, logs) ou si NO_COLOR est défini
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for name in [name for name in vars(Colors) if name.isupper()]:
+        setattr(Colors, name, '')
+
+
 # Services offerts par l'utilisateur (pour filtrer les opportunités pertinentes)
 MES_SERVICES = [
     "vidéo",
@@ -42,6 +67,33 @@ MES_SERVICES = [
     "marketing digital",
 ]
 
+# Signaux de besoin (cf. SYSTEM_PROMPT). Un post sans aucun de ces signaux ni
+# aucun mot-clé n'est pas envoyé à l'IA. Sous-chaînes, en minuscules.
+SIGNAUX_BESOIN = [
+    # Cherche quelqu'un
+    "cherch", "besoin", "recommand", "recommend", "connaiss", "quelqu'un",
+    "quelqu’un", "qqn", "référence", "suggestion", "engager", "embauch",
+    "looking for", "need", "anyone", "hiring", "help",
+    # Problèmes automatisables
+    "comment vous", "comment faites", "comment gérez", "comment gerez",
+    "des heures", "perds du temps", "perd du temps", "perte de temps",
+    "répétitif", "repetitif", "manuellement", "à chaque fois", "a chaque fois",
+    "je dois", "solution", "outil", "logiciel", "automat", "zapier", "crm",
+    "excel", "factur", "suivi", "relance", "rappel",
+    # Questions
+    "?",
+]
+
+# Nombre max de requêtes OpenAI simultanées (pour respecter les rate limits)
+AI_CONCURRENCY = 8
+
+# Intervalle entre deux vérifications du statut d'un batch (mode --batch)
+BATCH_POLL_SECONDS = 30
+
+# Cache disque des analyses IA. La clé est le hash de la requête complète
+# (modèle, prompt système, post): changer le prompt invalide donc le cache.
+AI_CACHE_PATH = Path(__file__).parent.parent / '.tmp' / 'ai_cache'
+
 # Prompt système pour l'analyse
 SYSTEM_PROMPT = """Tu es un assistant qui analyse des posts de groupes Facebook d'entrepreneurs québécois.
 
@@ -180,29 +232,56 @@ MÊME SI LE SUJET EST "HORS SCOPE" (compta, admin, etc.), si c'est un PROBLÈME
 
 def load_posts(file_path: Path) -> dict:
     """Charge les posts depuis un fichier JSON"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return loads_json(Path(file_path).read_bytes())
 
 
-# Mapping des mois français
+# Mapping des mois français (+ anglais: Facebook affiche aussi les dates en anglais)
 MOIS_FR = {
     'janvier': 1, 'février': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6,
     'juillet': 7, 'août': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11, 'décembre': 12,
-    'jan': 1, 'fév': 2, 'mar': 3, 'avr': 4, 'jun': 6,
-    'juil': 7, 'aoû': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'déc': 12
+    'jan': 1, 'janv': 1, 'fév': 2, 'févr': 2, 'mar': 3, 'avr': 4, 'jun': 6,
+    'juil': 7, 'aoû': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'déc': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'feb': 2, 'apr': 4, 'jul': 7, 'aug': 8, 'dec': 12
 }
 
-
-def parse_french_date(date_str: str) -> Optional[datetime]:
-    """Parse une date française et retourne un datetime"""
+# Regex compilées une seule fois (parse_french_date est appelée pour chaque post)
+RELATIVE_DATE_RE = re.compile(r'^(\d+)\s*(h|m|d|w|j|s|min|sec|sem|mo)\.?$')
+IL_Y_A_RE = re.compile(r'il y a\s+(\d+)\s*(jour|semaine|mois|heure)')
+DAY_RE = re.compile(r'(\d{1,2})')
+YEAR_RE = re.compile(r'(\d{4})')
+# Tous les mois en une seule passe: pas de lettre juste avant ni juste après
+# ('mar' ne doit pas matcher dans 'mardi'), mais un chiffre collé est accepté ('20octobre')
+MOIS_RE = re.compile(r'(?<![^\W\d_])(?:' + '|'.join(sorted(MOIS_FR, key=len, reverse=True)) + r')(?![^\W\d_])')
+
+
+def parse_french_date(date_str: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Parse une date française et retourne un datetime (relatif à `now`)
+
+    >>> now = datetime(2026, 10, 15)
+    >>> parse_french_date('mardi 3 juin', now=now)
+    datetime.datetime(2026, 6, 3, 0, 0)
+    >>> parse_french_date('20octobre', now=now)
+    datetime.datetime(2025, 10, 20, 0, 0)
+    >>> parse_french_date('16 sept.', now=now)
+    datetime.datetime(2026, 9, 16, 0, 0)
+    >>> parse_french_date('October 5', now=now)
+    datetime.datetime(2026, 10, 5, 0, 0)
+    >>> parse_french_date('March 3, 2025', now=now)
+    datetime.datetime(2025, 3, 3, 0, 0)
+    >>> parse_french_date('September 12', now=now)
+    datetime.datetime(2026, 9, 12, 0, 0)
+    """
     if not date_str:
         return None
     
     date_str = date_str.lower().strip()
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     
     # "5 h", "3 j", "2 sem", etc.
-    relative_match = re.match(r'^(\d+)\s*(h|m|d|w|j|s|min|sec|sem|mo)\.?$', date_str)
+    relative_match = RELATIVE_DATE_RE.match(date_str)
     if relative_match:
         num = int(relative_match.group(1))
         unit = relative_match.group(2)
@@ -223,7 +302,7 @@ def parse_french_date(date_str: str) -> Optional[datetime]:
         return now - timedelta(days=1)
     
     # "il y a X jours/semaines/mois"
-    il_y_a_match = re.match(r'il y a\s+(\d+)\s*(jour|semaine|mois|heure)', date_str)
+    il_y_a_match = IL_Y_A_RE.match(date_str)
     if il_y_a_match:
         num = int(il_y_a_match.group(1))
         unit = il_y_a_match.group(2)
@@ -237,34 +316,37 @@ def parse_french_date(date_str: str) -> Optional[datetime]:
             return now - timedelta(hours=num)
     
     # "20 octobre" ou "octobre 20"
-    for mois, num_mois in MOIS_FR.items():
-        if mois in date_str:
-            # Chercher le jour
-            day_match = re.search(r'(\d{1,2})', date_str)
-            if day_match:
-                day = int(day_match.group(1))
-                # Chercher l'année
-                year_match = re.search(r'(\d{4})', date_str)
-                year = int(year_match.group(1)) if year_match else now.year
-                
-                try:
-                    post_date = datetime(year, num_mois, day)
-                    # Si la date est dans le futur, c'est probablement l'année précédente
-                    if post_date > now:
-                        post_date = datetime(year - 1, num_mois, day)
-                    return post_date
-                except ValueError:
-                    pass
+    mois_match = MOIS_RE.search(date_str)
+    if mois_match:
+        num_mois = MOIS_FR[mois_match.group(0)]
+        # Chercher le jour
+        day_match = DAY_RE.search(date_str)
+        if day_match:
+            day = int(day_match.group(1))
+            # Chercher l'année
+            year_match = YEAR_RE.search(date_str)
+            year = int(year_match.group(1)) if year_match else now.year
+            
+            try:
+                post_date = datetime(year, num_mois, day)
+                # Si la date est dans le futur, c'est probablement l'année précédente
+                if post_date > now:
+                    post_date = datetime(year - 1, num_mois, day)
+                return post_date
+            except ValueError:
+                pass
     
     return None
 
 
-def get_post_age_days(post: dict) -> Optional[int]:
-    """Retourne l'âge du post en jours"""
+def get_post_age_days(post: dict, now: Optional[datetime] = None) -> Optional[int]:
+    """Retourne l'âge du post en jours (relatif à `now`)"""
     date_str = post.get('dateRelative') or post.get('date')
-    parsed = parse_french_date(date_str)
+    if now is None:
+        now = datetime.now()
+    parsed = parse_french_date(date_str, now)
     if parsed:
-        delta = datetime.now() - parsed
+        delta = now - parsed
         return delta.days
     return None
 
@@ -288,90 +370,386 @@ def format_age(days: Optional[int]) -> str:
     return f"{days // 365} an(s)"
 
 
-def analyze_post_with_ai(client: OpenAI, post: dict) -> dict:
-    """Analyse un post avec GPT-4o-mini"""
-    
+def empty_result(summary: str, reason: str) -> dict:
+    """Résultat « pas une opportunité » (post ignoré ou erreur)"""
+    return {
+        "is_opportunity": False,
+        "confidence": 0,
+        "category": None,
+        "summary": summary,
+        "reason": reason
+    }
+
+
+def compile_prefilter():
+    """Compile le préfiltre: tous les mots-clés et signaux en un seul scan"""
+    phrases = sorted({p.lower() for p in KEYWORDS + MES_SERVICES + SIGNAUX_BESOIN})
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for phrase in phrases:
+            automaton.add_word(phrase, phrase)
+        automaton.make_automaton()
+        return automaton
+    return re.compile('|'.join(re.escape(p) for p in phrases))
+
+
+PREFILTER = compile_prefilter()
+
+
+def has_opportunity_signal(text: str) -> bool:
+    """Vrai si le texte contient au moins un mot-clé ou signal de besoin"""
+    text_lower = text.lower()
+    if isinstance(PREFILTER, re.Pattern):
+        return PREFILTER.search(text_lower) is not None
+    return next(PREFILTER.iter(text_lower), None) is not None
+
+
+def prefilter_result(post: dict) -> Optional[dict]:
+    """Résultat immédiat pour un post qui ne vaut pas un appel à l'IA (None sinon)"""
     text = post.get('text', '')
+    if not text or len(text) < 20:
+        return empty_result("Post trop court", "Pas assez de contenu pour analyser")
+    if not has_opportunity_signal(text):
+        return empty_result("Aucun signal", "Aucun mot-clé ni signal de besoin dans le post")
+    return None
+
+
+def build_chat_request(post: dict) -> dict:
+    """Construit les paramètres de la requête chat.completions pour un post"""
+    user_message = f"""Analyse ce post Facebook :
+
+Auteur: {post.get('author', 'Inconnu')}
+Contenu: {post.get('text', '')[:1500]}"""
+    
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_message}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 300
+    }
+
+
+def parse_ai_response(result_text: str) -> dict:
+    """Parse la réponse JSON du modèle (lève json.JSONDecodeError si invalide)"""
+    result_text = result_text.strip()
+    
+    # Nettoyer si nécessaire (enlever ```json``` si présent)
+    if result_text.startswith('```'):
+        result_text = result_text.split('\n', 1)[1]
+        result_text = result_text.rsplit('```', 1)[0]
+    
+    return json.loads(result_text)
+
+
+def request_cache_key(request: dict) -> str:
+    """Clé de cache: SHA-256 de la requête chat.completions complète"""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def open_ai_cache():
+    """Ouvre le cache disque des analyses (None si indisponible)"""
+    try:
+        AI_CACHE_PATH.parent.mkdir(exist_ok=True)
+        return shelve.open(str(AI_CACHE_PATH))
+    except Exception as e:
+        print(f"  ⚠️ Cache IA indisponible: {e}")
+        return None
+
+
+async def analyze_post_with_ai(client: AsyncOpenAI, request: dict, key: str, cache=None) -> dict:
+    """
+    Analyse un post avec GPT-4o-mini (résultat mis en cache si `cache` est fourni)
+    
+    request / key: requête déjà construite par build_chat_request et sa request_cache_key
+    (calculées une seule fois par l'appelant, qui a aussi appliqué le préfiltre)
+    """
+    if cache is not None and key in cache:
+        return cache[key]
+    
+    result_text = ""
+    try:
+        response = await client.chat.completions.create(**request)
+        result_text = response.choices[0].message.content
+        result = parse_ai_response(result_text)
+    except json.JSONDecodeError as e:
+        print(f"  ⚠️ Erreur parsing JSON: {e}")
+        return empty_result("Erreur d'analyse", f"JSON invalide: {result_text[:100]}")
+    except Exception as e:
+        print(f"  ⚠️ Erreur API: {e}")
+        return empty_result("Erreur", str(e))
+    
+    # Ne mettre en cache que les analyses réussies
+    if cache is not None:
+        cache[key] = result
+    return result
+
+
+def print_post_progress(done: int, total: int, post: dict, result: dict, now: Optional[datetime] = None):
+    """Affiche le résultat de l'analyse d'un post"""
     author = post.get('author', 'Inconnu')
+    text_preview = (post.get('text', '')[:50] + '...') if post.get('text') else 'N/A'
+    age_days = get_post_age_days(post, now)
+    age_str = format_age(age_days)
     
-    if not text or len(text) < 20:
-        return {
-            "is_opportunity": False,
-            "confidence": 0,
-            "category": None,
-            "summary": "Post trop court",
-            "reason": "Pas assez de contenu pour analyser"
-        }
+    # Avertissement si post ancien (> 14 jours)
+    age_warning = ""
+    if age_days is not None and age_days > 14:
+        age_warning = f" {Colors.YELLOW}⚠️ ANCIEN ({age_str}){Colors.END}"
     
-    user_message = f"""Analyse ce post Facebook :
+    line = f"  [{done}/{total}] {author} ({age_str}): {text_preview}{age_warning}"
+    
+    if result.get('is_opportunity'):
+        conf = result.get('confidence', 0) * 100
+        opp_type = result.get('opportunity_type', '?')
+        type_emoji = "👥" if opp_type == "hiring" else "🤖" if opp_type == "automation" else "❓"
+        status = f"       {Colors.GREEN}✅ OPPORTUNITÉ {type_emoji} ({conf:.0f}%) - {result.get('category')}{Colors.END}"
+    else:
+        status = f"       {Colors.BLUE}⏭️ Pas une opportunité{Colors.END}"
+    
+    sys.stdout.write(f"{line}\n{status}\n")
+
+
+def print_skipped_count(skipped: int):
+    """Affiche le nombre de posts écartés par le préfiltre"""
+    if skipped:
+        print(f"\n  {Colors.BLUE}⏭️ {skipped} post(s) ignoré(s) sans appel à l'IA (trop courts ou sans signal){Colors.END}")
+
+
+def print_duplicate_count(duplicates: int):
+    """Affiche le nombre de posts identiques analysés une seule fois"""
+    if duplicates:
+        print(f"  {Colors.BLUE}🔁 {duplicates} post(s) en double (même auteur, même texte) analysé(s) une seule fois{Colors.END}")
 
-Auteur: {author}
-Contenu: {text[:1500]}"""
+
+async def analyze_posts_async(posts: list, api_key: Optional[str] = None) -> list:
+    """
+    Analyse les posts en parallèle (max AI_CONCURRENCY requêtes à la fois)
+    
+    Ajoute `ai_analysis` à chaque post et retourne les opportunités,
+    dans l'ordre des posts.
+    """
+    client = AsyncOpenAI(api_key=api_key)
+    semaphore = asyncio.Semaphore(AI_CONCURRENCY)
+    cache = open_ai_cache()
+    
+    skipped = 0
+    groups = {}  # clé de requête -> posts identiques (cross-posts), analysés une seule fois
+    requests = {}  # clé de requête -> requête chat.completions (construite une seule fois)
+    now = datetime.now()  # Une seule fois pour tout le run (âge des posts)
+    
+    async def analyze(key: str, group: list):
+        async with semaphore:
+            return group, await analyze_post_with_ai(client, requests[key], key, cache)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.3,
-            max_tokens=300
-        )
+        for post in posts:
+            # Préfiltre: pas d'appel à l'IA pour les posts sans aucun signal
+            result = prefilter_result(post)
+            if result:
+                post['ai_analysis'] = result
+                skipped += 1
+            else:
+                request = build_chat_request(post)
+                key = request_cache_key(request)
+                requests.setdefault(key, request)
+                groups.setdefault(key, []).append(post)
         
-        result_text = response.choices[0].message.content.strip()
+        tasks = [analyze(key, group) for key, group in groups.items()]
+        for done, task in enumerate(asyncio.as_completed(tasks), 1):
+            group, result = await task
+            for post in group:
+                post['ai_analysis'] = result
+            print_post_progress(done, len(tasks), group[0], result, now)
+    finally:
+        await client.close()
+        if cache is not None:
+            cache.close()
+    
+    print_skipped_count(skipped)
+    print_duplicate_count(sum(len(group) - 1 for group in groups.values()))
+    return [post for post in posts if post['ai_analysis'].get('is_opportunity')]
+
+
+def analyze_posts_with_ai(data: dict, api_key: Optional[str] = None) -> list:
+    """Analyse les posts de `data` avec l'IA et retourne les opportunités"""
+    return asyncio.run(analyze_posts_async(data.get('posts', []), api_key))
+
+
+def analyze_posts_with_batch(posts: list, work_dir: Path, api_key: Optional[str] = None) -> list:
+    """
+    Analyse les posts via le Batch API d'OpenAI (~50% moins cher, mais
+    les résultats arrivent en différé: de quelques minutes à 24h)
+    
+    Ajoute `ai_analysis` à chaque post et retourne les opportunités.
+    """
+    client = OpenAI(api_key=api_key)
+    cache = open_ai_cache()
+    
+    # 1. Fichier JSONL: une requête par post non encore analysé (custom_id = index du post)
+    lines = []
+    cache_keys = {}
+    groups = {}  # clé de requête -> indices des posts identiques (cross-posts)
+    skipped = 0
+    now = datetime.now()  # Une seule fois pour tout le run (âge des posts)
+    for i, post in enumerate(posts):
+        result = prefilter_result(post)
+        if result:
+            post['ai_analysis'] = result
+            skipped += 1
+            continue
+        request = build_chat_request(post)
+        key = request_cache_key(request)
+        if key in groups:
+            groups[key].append(i)
+            continue
+        groups[key] = [i]
+        if cache is not None and key in cache:
+            post['ai_analysis'] = cache[key]
+            continue
+        cache_keys[str(i)] = key
+        lines.append(json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": request
+        }, ensure_ascii=False))
+    
+    results = {}
+    if lines:
+        timestamp = datetime.now().strftime('%Y-%m-%dT%H-%M-%S')
+        batch_file = work_dir / f"ai_batch_{timestamp}.jsonl"
+        batch_file.write_text("\n".join(lines) + "\n", encoding='utf-8')
         
-        # Parser le JSON
-        # Nettoyer si nécessaire (enlever ```json``` si présent)
-        if result_text.startswith('```'):
-            result_text = result_text.split('\n', 1)[1]
-            result_text = result_text.rsplit('```', 1)[0]
+        # 2. Upload + création du batch (le fichier local n'est plus utile une fois envoyé)
+        try:
+            with open(batch_file, 'rb') as f:
+                uploaded = client.files.create(file=f, purpose="batch")
+        finally:
+            batch_file.unlink(missing_ok=True)
+        batch = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"  📦 Batch {batch.id} créé ({len(lines)} requêtes)")
         
-        result = json.loads(result_text)
-        return result
+        # 3. Attendre la fin du batch
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(BATCH_POLL_SECONDS)
+            batch = client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            done = f"{counts.completed}/{counts.total}" if counts else "?"
+            print(f"  ⏳ Batch {batch.status}: {done}")
         
-    except json.JSONDecodeError as e:
-        print(f"  ⚠️ Erreur parsing JSON: {e}")
-        return {
-            "is_opportunity": False,
-            "confidence": 0,
-            "category": None,
-            "summary": "Erreur d'analyse",
-            "reason": f"JSON invalide: {result_text[:100]}"
-        }
-    except Exception as e:
-        print(f"  ⚠️ Erreur API: {e}")
-        return {
-            "is_opportunity": False,
-            "confidence": 0,
-            "category": None,
-            "summary": "Erreur",
-            "reason": str(e)
-        }
+        if batch.status != "completed":
+            print(f"{Colors.RED}❌ Batch {batch.id} terminé avec le statut: {batch.status}{Colors.END}")
+        elif batch.output_file_id:
+            # 4. Télécharger les résultats et les rattacher aux posts par custom_id
+            output = client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    results[item["custom_id"]] = item
+    
+    for done, indices in enumerate(groups.values(), 1):
+        i = indices[0]
+        post = posts[i]
+        if str(i) in cache_keys:
+            item = results.get(str(i)) or {}
+            response = item.get("response") or {}
+            content = None
+            if response.get("status_code") == 200:
+                content = response["body"]["choices"][0]["message"]["content"]
+            if content is not None:
+                try:
+                    post['ai_analysis'] = parse_ai_response(content)
+                    if cache is not None:
+                        cache[cache_keys[str(i)]] = post['ai_analysis']
+                except json.JSONDecodeError as e:
+                    print(f"  ⚠️ Erreur parsing JSON: {e}")
+                    post['ai_analysis'] = empty_result("Erreur d'analyse", f"JSON invalide: {content[:100]}")
+            elif response.get("status_code") == 200:
+                # Refus ou sortie filtrée: pas de texte à parser, traité comme une ligne en erreur
+                post['ai_analysis'] = empty_result("Erreur", "Réponse vide du modèle (refus ou contenu filtré)")
+            else:
+                error = item.get("error") or "Pas de résultat dans le batch"
+                post['ai_analysis'] = empty_result("Erreur", str(error))
+        
+        for j in indices[1:]:
+            posts[j]['ai_analysis'] = post['ai_analysis']
+        print_post_progress(done, len(groups), post, post['ai_analysis'], now)
+    
+    if cache is not None:
+        cache.close()
+    
+    print_skipped_count(skipped)
+    print_duplicate_count(sum(len(indices) - 1 for indices in groups.values()))
+    
+    return [post for post in posts if post['ai_analysis'].get('is_opportunity')]
+
+
+def save_results(data: dict, opportunities: list, input_file: Path, source_saved: bool = True) -> dict:
+    """Sauvegarde les résultats de l'analyse à côté de `input_file` et les retourne
+
+    source_saved: False si `input_file` n'a pas été écrit sur disque (sourceFile vaut alors None)
+    """
+    posts = data.get('posts', [])
+    output_file = input_file.parent / f"ai_analyzed_{input_file.name}"
+    results = {
+        'analyzedAt': datetime.now().isoformat(),
+        'sourceFile': str(input_file) if source_saved else None,
+        'groupName': data.get('groupName'),
+        'totalPosts': len(posts),
+        'opportunitiesCount': len(opportunities),
+        'opportunities': opportunities,
+        'allPosts': posts
+    }
+    
+    with open(output_file, 'wb') as f:
+        f.write(dumps_json(results))
+    
+    print(f"\n{Colors.GREEN}✅ Résultats sauvegardés: {output_file}{Colors.END}")
+    return results
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Analyse les posts Facebook avec OpenAI"
+    )
+    parser.add_argument(
+        "input_file",
+        nargs="?",
+        type=Path,
+        help="Fichier JSON à analyser (défaut: le plus récent dans .tmp/)"
+    )
+    parser.add_argument(
+        "--batch", "-b",
+        action="store_true",
+        help="Utiliser le Batch API d'OpenAI (~50%% moins cher, résultats en différé)"
+    )
+    args = parser.parse_args()
+    
     # Vérifier la clé API
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         print(f"{Colors.RED}❌ OPENAI_API_KEY non trouvée dans .env{Colors.END}")
         sys.exit(1)
     
-    client = OpenAI(api_key=api_key)
-    
     # Trouver le fichier à analyser
     script_dir = Path(__file__).parent.parent
     tmp_dir = script_dir / '.tmp'
     
-    if len(sys.argv) > 1:
-        input_file = Path(sys.argv[1])
+    if args.input_file:
+        input_file = args.input_file
     else:
-        json_files = list(tmp_dir.glob("facebook_posts_*.json"))
-        if not json_files:
+        input_file = max(tmp_dir.glob("facebook_posts_*.json"), key=lambda x: x.stat().st_mtime, default=None)
+        if not input_file:
             print(f"{Colors.RED}❌ Aucun fichier facebook_posts_*.json dans .tmp/{Colors.END}")
             sys.exit(1)
-        json_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-        input_file = json_files[0]
     
     if not input_file.exists():
         print(f"{Colors.RED}❌ Fichier non trouvé: {input_file}{Colors.END}")
@@ -388,37 +766,17 @@ def main():
     print(f"{Colors.HEADER}{'='*60}{Colors.END}")
     print(f"\n{Colors.CYAN}Groupe:{Colors.END} {data.get('groupName', 'N/A')}")
     print(f"{Colors.CYAN}Total posts:{Colors.END} {len(posts)}")
-    print(f"\n{Colors.YELLOW}⏳ Analyse en cours avec GPT-4o-mini...{Colors.END}\n")
     
-    # Analyser chaque post
-    opportunities = []
-    
-    for i, post in enumerate(posts):
-        author = post.get('author', 'Inconnu')
-        text_preview = (post.get('text', '')[:50] + '...') if post.get('text') else 'N/A'
-        age_days = get_post_age_days(post)
-        age_str = format_age(age_days)
-        
-        # Avertissement si post ancien (> 14 jours)
-        age_warning = ""
-        if age_days is not None and age_days > 14:
-            age_warning = f" {Colors.YELLOW}⚠️ ANCIEN ({age_str}){Colors.END}"
-        
-        print(f"  [{i+1}/{len(posts)}] {author} ({age_str}): {text_preview}{age_warning}")
-        
-        result = analyze_post_with_ai(client, post)
-        post['ai_analysis'] = result
-        
-        if result.get('is_opportunity'):
-            opportunities.append(post)
-            conf = result.get('confidence', 0) * 100
-            opp_type = result.get('opportunity_type', '?')
-            type_emoji = "👥" if opp_type == "hiring" else "🤖" if opp_type == "automation" else "❓"
-            print(f"       {Colors.GREEN}✅ OPPORTUNITÉ {type_emoji} ({conf:.0f}%) - {result.get('category')}{Colors.END}")
-        else:
-            print(f"       {Colors.BLUE}⏭️ Pas une opportunité{Colors.END}")
+    if args.batch:
+        print(f"\n{Colors.YELLOW}⏳ Analyse en cours avec GPT-4o-mini (Batch API, peut prendre jusqu'à 24h)...{Colors.END}\n")
+        opportunities = analyze_posts_with_batch(posts, input_file.parent, api_key)
+    else:
+        print(f"\n{Colors.YELLOW}⏳ Analyse en cours avec GPT-4o-mini ({AI_CONCURRENCY} requêtes en parallèle)...{Colors.END}\n")
+        # Analyser tous les posts (requêtes concurrentes)
+        opportunities = analyze_posts_with_ai(data, api_key)
     
     # Afficher les résultats
+    now = datetime.now()
     print(f"\n{Colors.HEADER}{'='*60}{Colors.END}")
     print(f"{Colors.BOLD}📊 RÉSULTATS{Colors.END}")
     print(f"{Colors.HEADER}{'='*60}{Colors.END}")
@@ -433,47 +791,39 @@ def main():
         
         for i, post in enumerate(opportunities, 1):
             analysis = post.get('ai_analysis', {})
-            print(f"\n{Colors.BLUE}━━━ Opportunité #{i} ━━━{Colors.END}")
-            age_days = get_post_age_days(post)
+            age_days = get_post_age_days(post, now)
             age_str = format_age(age_days)
             age_color = Colors.GREEN if (age_days is not None and age_days <= 7) else Colors.YELLOW if (age_days is not None and age_days <= 30) else Colors.RED
             
             opp_type = analysis.get('opportunity_type', '?')
             type_label = "👥 Cherche quelqu'un" if opp_type == "hiring" else "🤖 Automatisable" if opp_type == "automation" else "❓ Autre"
             
-            print(f"{Colors.BOLD}👤 Auteur:{Colors.END} {post.get('author', 'Inconnu')}")
-            print(f"{Colors.BOLD}📅 Âge:{Colors.END} {age_color}{age_str}{Colors.END}")
-            print(f"{Colors.BOLD}🏷️  Type:{Colors.END} {type_label}")
-            print(f"{Colors.BOLD}📁 Catégorie:{Colors.END} {analysis.get('category', 'N/A')}")
-            print(f"{Colors.BOLD}📊 Confiance:{Colors.END} {analysis.get('confidence', 0)*100:.0f}%")
-            print(f"{Colors.BOLD}📝 Résumé:{Colors.END} {analysis.get('summary', 'N/A')}")
+            # Un seul write par opportunité au lieu d'un print par ligne
+            lines = [
+                f"\n{Colors.BLUE}━━━ Opportunité #{i} ━━━{Colors.END}",
+                f"{Colors.BOLD}👤 Auteur:{Colors.END} {post.get('author', 'Inconnu')}",
+                f"{Colors.BOLD}📅 Âge:{Colors.END} {age_color}{age_str}{Colors.END}",
+                f"{Colors.BOLD}🏷️  Type:{Colors.END} {type_label}",
+                f"{Colors.BOLD}📁 Catégorie:{Colors.END} {analysis.get('category', 'N/A')}",
+                f"{Colors.BOLD}📊 Confiance:{Colors.END} {analysis.get('confidence', 0)*100:.0f}%",
+                f"{Colors.BOLD}📝 Résumé:{Colors.END} {analysis.get('summary', 'N/A')}",
+            ]
             
             # Afficher le potentiel d'automatisation si présent
             if analysis.get('automation_potential'):
-                print(f"{Colors.BOLD}🤖 Automatisation possible:{Colors.END} {Colors.CYAN}{analysis.get('automation_potential')}{Colors.END}")
-            print(f"{Colors.BOLD}💬 Contenu:{Colors.END}")
-            print(f"   {post.get('text', 'N/A')[:300]}...")
-            print(f"{Colors.BOLD}🔗 Lien:{Colors.END} {post.get('postUrl', 'N/A')}")
-            print(f"{Colors.BOLD}👤 Profil:{Colors.END} {post.get('authorProfileUrl', 'N/A')}")
+                lines.append(f"{Colors.BOLD}🤖 Automatisation possible:{Colors.END} {Colors.CYAN}{analysis.get('automation_potential')}{Colors.END}")
+            lines += [
+                f"{Colors.BOLD}💬 Contenu:{Colors.END}",
+                f"   {post.get('text', 'N/A')[:300]}...",
+                f"{Colors.BOLD}🔗 Lien:{Colors.END} {post.get('postUrl', 'N/A')}",
+                f"{Colors.BOLD}👤 Profil:{Colors.END} {post.get('authorProfileUrl', 'N/A')}",
+            ]
+            sys.stdout.write("\n".join(lines) + "\n")
     else:
         print(f"\n{Colors.YELLOW}⚠️ Aucune opportunité détectée dans ces posts.{Colors.END}")
     
     # Sauvegarder les résultats
-    output_file = input_file.parent / f"ai_analyzed_{input_file.name}"
-    results = {
-        'analyzedAt': datetime.now().isoformat(),
-        'sourceFile': str(input_file),
-        'groupName': data.get('groupName'),
-        'totalPosts': len(posts),
-        'opportunitiesCount': len(opportunities),
-        'opportunities': opportunities,
-        'allPosts': posts
-    }
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    
-    print(f"\n{Colors.GREEN}✅ Résultats sauvegardés: {output_file}{Colors.END}")
+    save_results(data, opportunities, input_file)
 
 
 if __name__ == '__main__':
@@ -5,27 +5,41 @@ api_server.py - API pour déclencher le scraping à distance
 Endpoints:
 - GET /groups - Liste des groupes configurés
 - POST /scrape - Déclencher un scrape
-- GET /status - Status du scrape en cours
+- GET /status - Status du scrape en cours (?since=<n> pour ne recevoir que les nouveaux logs)
+- GET /status/stream - Logs et progression en temps réel (Server-Sent Events)
 
 Usage:
     python api_server.py
     # Server runs on http://localhost:5001
+
+    # Optionnel: scraping dans un worker séparé (REDIS_URL défini + pip install rq)
+    rq worker scrape --url $REDIS_URL
 """
 
+import asyncio
+import concurrent.futures
 import json
 import os
+import queue
 import sys
 import threading
 import uuid
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
 load_dotenv()
 
+# Modules voisins: JSON partagé et scraping (importés une seule fois, pas à chaque lancement)
+sys.path.insert(0, str(Path(__file__).parent))
+from json_utils import orjson, dumps_json, loads_json
+from auto_scrape import load_config, run_apify_scrape, transform_apify_data, run_ai_analysis, send_to_supabase, calculate_apify_cost
+
 # Supabase pour stockage persistant des tokens FCM
 supabase_client = None
 try:
@@ -42,6 +56,31 @@ except ImportError:
 except Exception as e:
     print(f"⚠️ Erreur Supabase: {e}")
 
+# File de jobs Redis/RQ (optionnelle): le scraping tourne alors dans un worker séparé
+# (`rq worker scrape`) au lieu d'un thread du serveur web
+scrape_queue = None
+redis_conn = None
+try:
+    from redis import Redis
+    from rq import Queue, get_current_job
+    from rq.job import Job
+    from rq.exceptions import NoSuchJobError
+    REDIS_URL = os.environ.get('REDIS_URL')
+    if REDIS_URL:
+        redis_conn = Redis.from_url(REDIS_URL)
+        scrape_queue = Queue('scrape', connection=redis_conn)
+        print("✅ Redis connecté - scraping via worker RQ")
+    else:
+        print("⚠️ REDIS_URL non configurée - scraping dans un thread du serveur")
+except ImportError:
+    print("⚠️ rq non installé - scraping dans un thread du serveur")
+except Exception as e:
+    print(f"⚠️ Erreur Redis: {e}")
+
+# Clé Redis de la dernière session lancée, et durée de conservation des jobs terminés
+CURRENT_SESSION_KEY = 'leadswipe:current_session'
+JOB_RESULT_TTL = 24 * 3600
+
 # Firebase Cloud Messaging (optionnel)
 firebase_enabled = False
 try:
@@ -90,19 +129,85 @@ except ImportError:
 except Exception as e:
     print(f"⚠️ Erreur initialisation Firebase: {e}")
 
-# Stockage des tokens FCM (en mémoire + Supabase pour persistance)
+# Stockage des tokens FCM (Redis si configuré, sinon en mémoire + Supabase pour persistance)
+# Avec Redis, le serveur web et le worker RQ partagent le même ensemble de tokens
 fcm_tokens = set()
+tokens_lock = threading.Lock()  # Les routes et les envois en arrière-plan modifient fcm_tokens
+FCM_TOKENS_KEY = 'fcm:tokens'
+
+# Nombre maximum de tokens par envoi groupé (limite de send_each_for_multicast)
+FCM_MULTICAST_LIMIT = 500
+
+# Délai max (secondes) d'un envoi groupé: au-delà, le thread appelant abandonne l'envoi
+FCM_SEND_TIMEOUT = 30
+
+# Boucle asyncio persistante pour FCM : le client httpx HTTP/2 du SDK reste lié
+# à une seule boucle, la connexion TLS est donc réutilisée d'un envoi à l'autre
+fcm_loop = None
+fcm_loop_lock = threading.Lock()
+
+def get_fcm_loop():
+    """Démarre (une seule fois) la boucle asyncio dédiée aux envois FCM"""
+    global fcm_loop
+    with fcm_loop_lock:
+        if fcm_loop is None:
+            fcm_loop = asyncio.new_event_loop()
+            threading.Thread(target=fcm_loop.run_forever, daemon=True).start()
+        return fcm_loop
+
+def send_multicast(message):
+    """Envoie un MulticastMessage via HTTP/2 si le SDK le permet (firebase-admin >= 6.9)"""
+    if hasattr(messaging, 'send_each_for_multicast_async'):
+        future = asyncio.run_coroutine_threadsafe(
+            messaging.send_each_for_multicast_async(message), get_fcm_loop()
+        )
+        try:
+            return future.result(timeout=FCM_SEND_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            # Annule la coroutine sur la boucle FCM pour ne pas la laisser tourner en fond
+            future.cancel()
+            raise TimeoutError(f"envoi FCM sans réponse après {FCM_SEND_TIMEOUT}s")
+    return messaging.send_each_for_multicast(message)
+
+def get_fcm_tokens():
+    """Retourne la liste des tokens FCM enregistrés"""
+    if redis_conn is not None:
+        return [token.decode() for token in redis_conn.smembers(FCM_TOKENS_KEY)]
+    with tokens_lock:
+        return list(fcm_tokens)
+
+def add_fcm_tokens(*tokens):
+    """Ajoute des tokens FCM et retourne le nombre total de devices"""
+    if redis_conn is not None:
+        pipe = redis_conn.pipeline()
+        pipe.sadd(FCM_TOKENS_KEY, *tokens)
+        pipe.scard(FCM_TOKENS_KEY)
+        return pipe.execute()[-1]
+    with tokens_lock:
+        fcm_tokens.update(tokens)
+        return len(fcm_tokens)
+
+def remove_fcm_tokens(*tokens):
+    """Retire des tokens FCM et retourne le nombre total de devices"""
+    if redis_conn is not None:
+        pipe = redis_conn.pipeline()
+        if tokens:
+            pipe.srem(FCM_TOKENS_KEY, *tokens)
+        pipe.scard(FCM_TOKENS_KEY)
+        return pipe.execute()[-1]
+    with tokens_lock:
+        fcm_tokens.difference_update(tokens)
+        return len(fcm_tokens)
 
 def load_fcm_tokens_from_supabase():
     """Charge les tokens FCM depuis Supabase au démarrage"""
-    global fcm_tokens
     if not supabase_client:
         return
     try:
         response = supabase_client.table('fcm_tokens').select('token').execute()
         if response.data:
-            fcm_tokens = set(row['token'] for row in response.data)
-            print(f"✅ {len(fcm_tokens)} token(s) FCM chargé(s) depuis Supabase")
+            add_fcm_tokens(*(row['token'] for row in response.data))
+            print(f"✅ {len(response.data)} token(s) FCM chargé(s) depuis Supabase")
     except Exception as e:
         print(f"⚠️ Erreur chargement tokens FCM: {e}")
 
@@ -130,10 +235,25 @@ def delete_fcm_token_from_supabase(token: str):
 # Charger les tokens au démarrage
 load_fcm_tokens_from_supabase()
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Réponses JSON de Flask (jsonify) sérialisées avec orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        # Les types inconnus d'orjson passent par le default de Flask (Decimal, UUID, ...)
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)  # Permet les requêtes cross-origin depuis React
 
-# État du scraping
+# État du scraping (lu par /status pendant que le thread de scraping l'écrit: toujours passer par status_lock)
+status_lock = threading.Lock()
 scrape_status = {
     "is_running": False,
     "current_session_id": None,
@@ -142,18 +262,118 @@ scrape_status = {
     "progress": None,
     "progress_percent": 0,  # 0-100 pour la barre de progression
     "last_result": None,
-    "logs": []  # Buffer de logs pour affichage temps réel
+    "logs": deque(maxlen=50),  # Buffer des 50 derniers logs pour affichage temps réel
+    "log_seq": 0  # Numéro du dernier log de la session (les logs en mémoire vont de log_seq-len+1 à log_seq)
 }
 
+# Clients connectés à /status/stream: une queue de réveil par client
+log_subscribers = []
+subscribers_lock = threading.Lock()
+
+def utc_timestamp() -> str:
+    """Horodatage UTC à la seconde, ex: 2025-01-31T12:00:00Z"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
 def add_log(message: str):
     """Ajoute un message au buffer de logs avec timestamp"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
+    now = datetime.now()
+    timestamp = f"{now.hour:02d}:{now.minute:02d}:{now.second:02d}"  # Plus rapide que strftime
     log_entry = f"[{timestamp}] {message}"
-    scrape_status["logs"].append(log_entry)
-    # Garder seulement les 50 derniers logs
-    if len(scrape_status["logs"]) > 50:
-        scrape_status["logs"] = scrape_status["logs"][-50:]
+    with status_lock:
+        scrape_status["logs"].append(log_entry)  # Les plus anciens sont évincés au-delà de 50
+        scrape_status["log_seq"] += 1
     print(log_entry)  # Aussi afficher dans la console
+    publish_status()
+    notify_subscribers()
+
+
+def set_status(**fields):
+    """Met à jour plusieurs champs de scrape_status d'un coup"""
+    with status_lock:
+        scrape_status.update(fields)
+    publish_status()
+    notify_subscribers()
+
+
+def notify_subscribers():
+    """Réveille les clients de /status/stream après un changement d'état"""
+    with subscribers_lock:
+        for wakeup in log_subscribers:
+            try:
+                wakeup.put_nowait(None)
+            except queue.Full:
+                pass  # Un réveil est déjà en attente pour ce client
+
+
+def new_session_status(session_id: str, started_at: str = None) -> dict:
+    """État initial d'une nouvelle session de scraping"""
+    return {
+        "is_running": True,
+        "current_session_id": session_id,
+        "started_at": started_at or utc_timestamp(),
+        "groups_scraping": [],
+        "progress": "Initialisation...",
+        "progress_percent": 0,  # Reset à 0
+        "last_result": None,
+        "logs": deque(maxlen=50),  # Reset les logs
+        "log_seq": 0
+    }
+
+
+def status_snapshot() -> dict:
+    """Copie de scrape_status sérialisable en JSON (logs en liste)"""
+    with status_lock:
+        snapshot = dict(scrape_status)
+        snapshot["logs"] = list(scrape_status["logs"])
+    return snapshot
+
+
+def publish_status():
+    """Dans un worker RQ, publie scrape_status dans job.meta pour que /status le lise"""
+    job = get_current_job() if scrape_queue is not None else None
+    if job is None:
+        return
+    job.meta["status"] = status_snapshot()
+    job.save_meta()
+
+
+def get_queue_status() -> dict:
+    """État de la dernière session lancée via RQ (None si aucune)"""
+    session_id = redis_conn.get(CURRENT_SESSION_KEY)
+    if not session_id:
+        return None
+    try:
+        job = Job.fetch(session_id.decode(), connection=redis_conn)
+    except NoSuchJobError:
+        return None
+    
+    status = dict(job.meta.get("status") or {})
+    # Un worker tué en plein scrape n'a pas pu publier is_running=False
+    status["is_running"] = job.get_status() in ("queued", "started", "deferred", "scheduled")
+    return status
+
+
+def current_status() -> dict:
+    """État du scrape en cours (depuis Redis si le scraping tourne dans un worker RQ)"""
+    snapshot = status_snapshot()
+    if scrape_queue is not None:
+        snapshot = get_queue_status() or snapshot
+    return snapshot
+
+
+def logs_since(status: dict, seq: int) -> list:
+    """Logs de `status` arrivés après le log numéro `seq`"""
+    count = status.get("log_seq", 0) - seq
+    if count <= 0:
+        return []
+    return status["logs"][-count:]
+
+
+def get_status_field(name: str):
+    """Lit un champ de scrape_status"""
+    with status_lock:
+        return scrape_status[name]
 
 
 def send_push_notification(title: str, body: str, data: dict = None):
@@ -162,47 +382,63 @@ def send_push_notification(title: str, body: str, data: dict = None):
         print(f"📱 [FCM désactivé] {title}: {body}")
         return False
     
-    if not fcm_tokens:
-        print("📱 Aucun device enregistré pour les notifications")
+    tokens = get_fcm_tokens()
+    if not tokens:
         return False
     
     success_count = 0
     failed_tokens = []
+    # Contenu commun à toutes les tranches, construit une seule fois
+    notification = messaging.Notification(title=title, body=body)
+    payload_data = data or {}
     
-    for token in list(fcm_tokens):
+    # Un envoi groupé par tranche de FCM_MULTICAST_LIMIT tokens (au lieu d'une requête par token)
+    for start in range(0, len(tokens), FCM_MULTICAST_LIMIT):
+        chunk = tokens[start:start + FCM_MULTICAST_LIMIT]
+        message = messaging.MulticastMessage(
+            notification=notification,
+            data=payload_data,
+            tokens=chunk,
+        )
         try:
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body,
-                ),
-                data=data or {},
-                token=token,
-            )
-            response = messaging.send(message)
-            print(f"📱 Notification envoyée: {response}")
-            success_count += 1
+            response = send_multicast(message)
         except Exception as e:
-            error_str = str(e)
+            print(f"❌ Erreur envoi notifications: {e}")
+            continue
+        
+        success_count += response.success_count
+        for token, result in zip(chunk, response.responses):
+            if result.success:
+                continue
+            error_str = str(result.exception)
             print(f"❌ Erreur envoi notification: {error_str}")
             # Supprimer les tokens invalides
             if "not found" in error_str.lower() or "invalid" in error_str.lower():
                 failed_tokens.append(token)
     
-    # Nettoyer les tokens invalides
-    for token in failed_tokens:
-        fcm_tokens.discard(token)
-        print(f"🗑️ Token invalide supprimé")
+    # Nettoyer les tokens invalides (store partagé + Supabase)
+    if failed_tokens:
+        remove_fcm_tokens(*failed_tokens)
+        for token in failed_tokens:
+            delete_fcm_token_from_supabase(token)
+        print(f"🗑️ {len(failed_tokens)} token(s) invalide(s) supprimé(s)")
     
-    print(f"📱 Notifications: {success_count}/{len(fcm_tokens) + len(failed_tokens)} envoyées")
+    print(f"📱 Notifications: {success_count}/{len(tokens)} envoyées")
     return success_count > 0
 
 
+# Groupes déjà parsés, relus seulement quand groups.json change (clé: st_mtime_ns)
+groups_cache = {"mtime": None, "groups": None, "ids": None}
+
+
 def load_groups():
-    """Charge la liste des groupes depuis config/groups.json"""
+    """Charge la liste des groupes depuis config/groups.json (en cache tant que le fichier ne change pas)"""
     config_path = Path(__file__).parent.parent / 'config' / 'groups.json'
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    mtime = config_path.stat().st_mtime_ns
+    if groups_cache["mtime"] == mtime:
+        return groups_cache["groups"]
+    
+    config = loads_json(config_path.read_bytes())
     
     groups = []
     for i, g in enumerate(config.get('groups', [])):
@@ -211,37 +447,54 @@ def load_groups():
             "name": g['name'],
             "url": g['url']
         })
+    
+    groups_cache["groups"] = groups
+    groups_cache["ids"] = {g['id'] for g in groups}
+    groups_cache["mtime"] = mtime
     return groups
 
 
+def valid_group_ids() -> set:
+    """IDs des groupes configurés (calculés une seule fois par version de groups.json)"""
+    load_groups()  # Rafraîchit le cache si groups.json a changé
+    return groups_cache["ids"]
+
+
+def run_scrape_job(group_ids, session_id, started_at):
+    """Point d'entrée du worker RQ: même scraping, état publié dans job.meta"""
+    global scrape_status
+    with status_lock:
+        scrape_status = new_session_status(session_id, started_at)
+    run_scrape_async(group_ids, session_id)
+
+
 def run_scrape_async(group_ids, session_id):
     """Lance le scraping en arrière-plan"""
-    global scrape_status
-    
     try:
-        # Importer le module de scraping
-        sys.path.insert(0, str(Path(__file__).parent))
-        from auto_scrape import load_config, run_apify_scrape, transform_apify_data, run_ai_analysis, send_to_supabase
-        
         # === ÉTAPE 1: Chargement config (0-5%) ===
-        scrape_status["progress_percent"] = 2
+        set_status(progress_percent=2)
         add_log("📋 Chargement de la configuration...")
         config = load_config()
         all_groups = config.get('groups', [])
         add_log(f"✓ {len(all_groups)} groupes trouvés")
-        scrape_status["progress_percent"] = 5
+        set_status(progress_percent=5)
         
         # Filtrer les groupes si spécifié
         if group_ids != "all":
-            all_groups_with_ids = list(enumerate(all_groups))
-            selected_groups = [g for i, g in all_groups_with_ids if f"group_{i+1}" in group_ids]
+            group_ids_set = set(group_ids)
+            selected_groups = [g for i, g in enumerate(all_groups) if f"group_{i+1}" in group_ids_set]
             add_log(f"🔍 Filtrage: {len(selected_groups)} groupe(s) sélectionné(s)")
         else:
             selected_groups = all_groups
             add_log(f"🔍 Mode: Tous les groupes ({len(selected_groups)})")
         
-        scrape_status["groups_scraping"] = [g['name'] for g in selected_groups]
-        scrape_status["progress"] = "Scraping en cours via Apify..."
+        # Noms et URLs des groupes calculés une seule fois pour tout le scrape
+        group_names = [g['name'] for g in selected_groups]
+        group_urls = [g['url'] for g in selected_groups]
+        set_status(
+            groups_scraping=group_names,
+            progress="Scraping en cours via Apify..."
+        )
         add_log(f"🚀 Démarrage scraping de {len(selected_groups)} groupe(s)")
         for g in selected_groups:
             add_log(f"   • {g['name']}")
@@ -249,33 +502,30 @@ def run_scrape_async(group_ids, session_id):
         # === ÉTAPE 2: Connexion Apify (5-10%) ===
         posts_per_group = config.get('settings', {}).get('posts_per_group', 50)
         add_log(f"⚙️ Configuration: {posts_per_group} posts/groupe")
-        scrape_status["progress_percent"] = 8
+        set_status(progress_percent=8)
         add_log("📡 Connexion à Apify...")
-        scrape_status["progress_percent"] = 10
+        set_status(progress_percent=10)
         add_log("⏳ Scraping Facebook en cours...")
         
         # === ÉTAPE 3: Scraping (10-60%) ===
         # Note: Apify ne donne pas de progression par groupe, donc on met 35% pendant le scraping
-        scrape_status["progress_percent"] = 35
-        items = run_apify_scrape(selected_groups, posts_per_group)
-        scrape_status["progress_percent"] = 60
+        set_status(progress_percent=35)
+        items, apify_runs = run_apify_scrape(selected_groups, posts_per_group, urls=group_urls)
+        set_status(progress="Transformation des posts...", progress_percent=60)
+        
+        # Transformer les données au fil de la lecture du dataset Apify
+        add_log("🔄 Transformation des données...")
+        data = transform_apify_data(items or [], selected_groups, group_names=group_names, group_urls=group_urls)
+        set_status(progress_percent=62)
         
-        if not items:
+        if not data['itemsCount']:
             add_log("⚠️ Aucun post récupéré")
-            scrape_status["progress"] = "Aucun post récupéré"
-            scrape_status["progress_percent"] = 100
-            scrape_status["is_running"] = False
+            set_status(progress="Aucun post récupéré", progress_percent=100, is_running=False)
             return
         
-        add_log(f"✅ {len(items)} posts récupérés depuis Facebook")
-        scrape_status["progress"] = f"Transformation de {len(items)} posts..."
-        scrape_status["progress_percent"] = 62
-        
-        # Transformer les données
-        add_log("🔄 Transformation des données...")
-        data = transform_apify_data(items, selected_groups)
+        add_log(f"✅ {data['itemsCount']} posts récupérés depuis Facebook")
         add_log(f"✓ {data['postsCount']} posts avec texte")
-        scrape_status["progress_percent"] = 65
+        set_status(progress_percent=65)
         
         # Sauvegarder
         add_log("💾 Sauvegarde des données...")
@@ -284,87 +534,80 @@ def run_scrape_async(group_ids, session_id):
         output_dir.mkdir(exist_ok=True)
         output_file = output_dir / f'api_scrape_{timestamp}.json'
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        output_file.write_bytes(dumps_json(data))
         
         add_log(f"📁 Fichier créé: api_scrape_{timestamp}.json")
-        scrape_status["progress_percent"] = 68
+        set_status(progress_percent=68)
         
         # === ÉTAPE 4: Analyse IA (68-85%) ===
-        scrape_status["progress"] = "Analyse IA en cours..."
+        set_status(progress="Analyse IA en cours...")
         add_log("🤖 Lancement de l'analyse IA...")
-        scrape_status["progress_percent"] = 70
+        set_status(progress_percent=70)
         add_log("⏳ GPT-4o-mini analyse les posts...")
-        scrape_status["progress_percent"] = 75
+        set_status(progress_percent=75)
         
-        # Lancer l'analyse IA
-        success = run_ai_analysis(output_file)
-        scrape_status["progress_percent"] = 85
+        # Lancer l'analyse IA dans ce processus, sur les données déjà en mémoire
+        results = run_ai_analysis(output_file, data)
+        success = results is not None
+        set_status(progress_percent=85)
         
         if success:
             add_log("✓ Analyse IA terminée")
-            analyzed_file = output_dir / f'ai_analyzed_api_scrape_{timestamp}.json'
-            if analyzed_file.exists():
-                add_log("📊 Chargement des résultats...")
-                scrape_status["progress_percent"] = 87
-                with open(analyzed_file, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-                
-                opportunities = results.get('opportunities', [])
-                group_names = [g['name'] for g in selected_groups]
-                
-                add_log(f"🎯 {len(opportunities)} opportunités détectées")
-                scrape_status["progress_percent"] = 88
-                
-                if opportunities:
-                    # Afficher un aperçu des opportunités trouvées
-                    for i, opp in enumerate(opportunities[:3]):
-                        category = opp.get('ai_analysis', {}).get('category', '?')
-                        add_log(f"   #{i+1} [{category}] {opp.get('author', 'Inconnu')[:20]}")
-                    if len(opportunities) > 3:
-                        add_log(f"   ... et {len(opportunities) - 3} autres")
-                
-                # === ÉTAPE 5: Envoi Supabase (88-100%) ===
-                scrape_status["progress"] = f"Envoi de {len(opportunities)} opportunités à Supabase..."
-                scrape_status["progress_percent"] = 90
-                add_log("📤 Connexion à Supabase...")
-                add_log("⏳ Envoi des données...")
-                scrape_status["progress_percent"] = 92
-                
-                # Calculer le coût Apify
-                # Pricing: $4.00 / 1000 posts + $1.00 / 1000 (date filter) + $0.005 (actor start)
-                total_posts_scraped = len(items)  # Nombre TOTAL de posts avant filtrage IA
-                cost_posts = (total_posts_scraped / 1000) * 4.00
-                cost_date_filter = (total_posts_scraped / 1000) * 1.00
-                cost_actor_start = 0.005
-                apify_cost = round(cost_posts + cost_date_filter + cost_actor_start, 4)
-                add_log(f"💰 Coût Apify estimé: ${apify_cost:.4f}")
-                
-                # Envoyer à Supabase avec le coût
-                send_to_supabase(
-                    opportunities,
-                    groups_scraped=group_names,
-                    started_at=scrape_status["started_at"],
-                    cost=apify_cost  # ← NOUVEAU: envoi du coût
-                )
-                scrape_status["progress_percent"] = 98
-                
-                add_log("✓ Données envoyées à Supabase")
-                
-                scrape_status["last_result"] = {
-                    "session_id": session_id,
-                    "total_posts": data['postsCount'],
-                    "opportunities_found": len(opportunities),
-                    "groups_scraped": group_names,
-                    "completed_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    "cost": apify_cost  # ← Coût Apify
-                }
+            set_status(progress_percent=87)
+            
+            opportunities = results.get('opportunities', [])
+            
+            add_log(f"🎯 {len(opportunities)} opportunités détectées")
+            set_status(progress_percent=88)
+            
+            if opportunities:
+                # Afficher un aperçu des opportunités trouvées
+                for i, opp in enumerate(opportunities[:3]):
+                    category = opp.get('ai_analysis', {}).get('category', '?')
+                    add_log(f"   #{i+1} [{category}] {opp.get('author', 'Inconnu')[:20]}")
+                if len(opportunities) > 3:
+                    add_log(f"   ... et {len(opportunities) - 3} autres")
+            
+            # === ÉTAPE 5: Envoi Supabase (88-100%) ===
+            set_status(
+                progress=f"Envoi de {len(opportunities)} opportunités à Supabase...",
+                progress_percent=90
+            )
+            add_log("📤 Connexion à Supabase...")
+            add_log("⏳ Envoi des données...")
+            set_status(progress_percent=92)
+            
+            # Calculer le coût Apify
+            # Pricing: $4.00 / 1000 posts + $1.00 / 1000 (date filter) + $0.005 (actor start)
+            total_posts_scraped = data['itemsCount']  # Nombre TOTAL de posts avant filtrage IA
+            apify_cost = calculate_apify_cost(total_posts_scraped, use_date_filter=True, runs=apify_runs)
+            add_log(f"💰 Coût Apify estimé: ${apify_cost:.4f}")
+            
+            # Envoyer à Supabase avec le coût
+            send_to_supabase(
+                opportunities,
+                groups_scraped=group_names,
+                started_at=get_status_field("started_at"),
+                cost=apify_cost  # ← NOUVEAU: envoi du coût
+            )
+            set_status(progress_percent=98)
+            
+            add_log("✓ Données envoyées à Supabase")
+            
+            set_status(last_result={
+                "session_id": session_id,
+                "total_posts": data['postsCount'],
+                "opportunities_found": len(opportunities),
+                "groups_scraped": group_names,
+                "completed_at": utc_timestamp(),
+                "cost": apify_cost  # ← Coût Apify
+            })
         
         # === TERMINÉ (100%) ===
-        scrape_status["progress_percent"] = 100
+        set_status(progress_percent=100)
         add_log("🏁 Scraping terminé avec succès!")
         add_log(f"📈 Résumé: {data['postsCount']} posts → {len(opportunities) if success else 0} opportunités")
-        scrape_status["progress"] = "Terminé!"
+        set_status(progress="Terminé!")
         
         # Envoyer une notification push
         opp_count = len(opportunities) if success else 0
@@ -387,11 +630,13 @@ def run_scrape_async(group_ids, session_id):
         
     except Exception as e:
         add_log(f"❌ Erreur: {str(e)}")
-        scrape_status["progress"] = f"Erreur: {str(e)}"
-        scrape_status["progress_percent"] = 100  # Marquer comme terminé même en cas d'erreur
+        set_status(
+            progress=f"Erreur: {str(e)}",
+            progress_percent=100  # Marquer comme terminé même en cas d'erreur
+        )
     
     finally:
-        scrape_status["is_running"] = False
+        set_status(is_running=False)
 
 
 @app.route('/groups', methods=['GET'])
@@ -413,20 +658,12 @@ def start_scrape():
     """Déclenche un nouveau scrape"""
     global scrape_status
     
-    if scrape_status["is_running"]:
-        return jsonify({
-            "success": False,
-            "error": "Un scrape est déjà en cours",
-            "current_session_id": scrape_status["current_session_id"]
-        }), 409
-    
     data = request.get_json() or {}
     group_ids = data.get('group_ids', 'all')
     
     # Valider les group_ids
     if group_ids != "all":
-        available_groups = load_groups()
-        available_ids = [g['id'] for g in available_groups]
+        available_ids = valid_group_ids()
         invalid_ids = [gid for gid in group_ids if gid not in available_ids]
         if invalid_ids:
             return jsonify({
@@ -434,23 +671,40 @@ def start_scrape():
                 "error": f"Group IDs invalides: {invalid_ids}"
             }), 400
     
-    # Créer une nouvelle session (reset les logs)
-    session_id = str(uuid.uuid4())
-    scrape_status = {
-        "is_running": True,
-        "current_session_id": session_id,
-        "started_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
-        "groups_scraping": [],
-        "progress": "Initialisation...",
-        "progress_percent": 0,  # Reset à 0
-        "last_result": None,
-        "logs": []  # Reset les logs
-    }
+    # Vérifier et réserver le slot sous le verrou: deux POST simultanés ne lancent qu'un scrape
+    with status_lock:
+        current = (get_queue_status() if scrape_queue is not None else scrape_status) or {}
+        if current.get("is_running"):
+            return jsonify({
+                "success": False,
+                "error": "Un scrape est déjà en cours",
+                "current_session_id": current.get("current_session_id")
+            }), 409
+        
+        # Créer une nouvelle session (reset les logs)
+        session_id = str(uuid.uuid4())
+        session_status = new_session_status(session_id)
+        
+        if scrape_queue is not None:
+            # Le worker RQ reprend cette session et publie sa progression dans job.meta
+            initial_status = {**session_status, "logs": []}
+            scrape_queue.enqueue(
+                run_scrape_job, group_ids, session_id, session_status["started_at"],
+                job_id=session_id,
+                job_timeout=3600,
+                result_ttl=JOB_RESULT_TTL,
+                failure_ttl=JOB_RESULT_TTL,
+                meta={"status": initial_status}
+            )
+            redis_conn.set(CURRENT_SESSION_KEY, session_id)
+        else:
+            scrape_status = session_status
     
-    # Lancer le scrape en arrière-plan
-    thread = threading.Thread(target=run_scrape_async, args=(group_ids, session_id))
-    thread.daemon = True
-    thread.start()
+    # Sans file de jobs: lancer le scrape en arrière-plan dans ce processus
+    if scrape_queue is None:
+        thread = threading.Thread(target=run_scrape_async, args=(group_ids, session_id))
+        thread.daemon = True
+        thread.start()
     
     return jsonify({
         "success": True,
@@ -463,12 +717,72 @@ def start_scrape():
 @app.route('/status', methods=['GET'])
 def get_status():
     """Retourne le status du scrape en cours"""
+    status = current_status()
+    # ?since=<n>: seulement les logs numéro >= n (le client envoie son dernier log_seq + 1)
+    since = request.args.get('since', type=int)
+    if since is not None:
+        status["logs"] = logs_since(status, since - 1)
     return jsonify({
         "success": True,
-        **scrape_status
+        **status
     })
 
 
+def status_events(last_seq: int):
+    """Événements SSE: chaque nouveau log avec la progression, jusqu'à la fin du scrape"""
+    wakeup = queue.Queue(maxsize=1)
+    with subscribers_lock:
+        log_subscribers.append(wakeup)
+    
+    try:
+        session_id = None
+        percent = None
+        while True:
+            status = current_status()
+            if status.get("current_session_id") != session_id:
+                # Nouvelle session: sa numérotation des logs repart de zéro
+                if session_id is not None:
+                    last_seq = 0
+                session_id = status.get("current_session_id")
+            
+            new_logs = logs_since(status, last_seq)
+            first_seq = status.get("log_seq", 0) - len(new_logs) + 1
+            for seq, log_entry in enumerate(new_logs, first_seq):
+                payload = {"log": log_entry, "percent": status.get("progress_percent"), "progress": status.get("progress")}
+                yield f"id: {seq}\ndata: {app.json.dumps(payload)}\n\n"
+            if not new_logs and status.get("progress_percent") != percent:
+                payload = {"log": None, "percent": status.get("progress_percent"), "progress": status.get("progress")}
+                yield f"data: {app.json.dumps(payload)}\n\n"
+            last_seq = status.get("log_seq", 0)
+            percent = status.get("progress_percent")
+            
+            if not status.get("is_running"):
+                payload = {"last_result": status.get("last_result"), "progress": status.get("progress")}
+                yield f"event: end\ndata: {app.json.dumps(payload)}\n\n"
+                return
+            
+            # Dans ce processus: réveillé par add_log/set_status; avec RQ: relire Redis chaque seconde
+            try:
+                wakeup.get(timeout=1 if scrape_queue is not None else 15)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+    finally:
+        with subscribers_lock:
+            log_subscribers.remove(wakeup)
+
+
+@app.route('/status/stream', methods=['GET'])
+def stream_status():
+    """Pousse les logs et la progression du scrape en cours (Server-Sent Events)"""
+    # EventSource renvoie Last-Event-ID à la reconnexion: reprendre après le dernier log reçu
+    last_seq = request.headers.get('Last-Event-ID', type=int) or 0
+    return Response(
+        status_events(last_seq),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/', methods=['GET', 'HEAD'])
 def root():
     """Root endpoint - utilisé par Render pour le health check"""
@@ -477,14 +791,14 @@ def root():
         "status": "healthy",
         "version": "1.1.0",
         "firebase_enabled": firebase_enabled,
-        "endpoints": ["/groups", "/scrape", "/status", "/health", "/register-device", "/test-notification"]
+        "endpoints": ["/groups", "/scrape", "/status", "/status/stream", "/health", "/register-device", "/test-notification"]
     })
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "ok", "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')})
+    return jsonify({"status": "ok", "timestamp": utc_timestamp()})
 
 
 @app.route('/register-device', methods=['POST'])
@@ -499,15 +813,15 @@ def register_device():
             "error": "fcm_token requis"
         }), 400
     
-    fcm_tokens.add(fcm_token)
+    total_devices = add_fcm_tokens(fcm_token)
     save_fcm_token_to_supabase(fcm_token)  # Persistance Supabase
-    print(f"📱 Device enregistré (total: {len(fcm_tokens)})")
+    print(f"📱 Device enregistré (total: {total_devices})")
     
     return jsonify({
         "success": True,
         "message": "Device enregistré pour les notifications",
         "firebase_enabled": firebase_enabled,
-        "total_devices": len(fcm_tokens)
+        "total_devices": total_devices
     })
 
 
@@ -517,15 +831,16 @@ def unregister_device():
     data = request.get_json() or {}
     fcm_token = data.get('fcm_token')
     
+    total_devices = remove_fcm_tokens(fcm_token) if fcm_token else remove_fcm_tokens()
+    
     if fcm_token:
-        fcm_tokens.discard(fcm_token)
         delete_fcm_token_from_supabase(fcm_token)  # Supprimer de Supabase
-        print(f"📱 Device désenregistré (total: {len(fcm_tokens)})")
+        print(f"📱 Device désenregistré (total: {total_devices})")
     
     return jsonify({
         "success": True,
         "message": "Device désenregistré",
-        "total_devices": len(fcm_tokens)
+        "total_devices": total_devices
     })
 
 
@@ -538,7 +853,7 @@ def test_notification():
     delay_seconds = data.get('delay_seconds', 0)
     
     # Vérifier qu'il y a des devices enregistrés
-    if not fcm_tokens:
+    if not get_fcm_tokens():
         return jsonify({
             "success": False,
             "error": "Aucun device enregistré"
@@ -591,6 +906,7 @@ if __name__ == '__main__':
     print("  GET  /groups           - Liste des groupes configurés")
     print("  POST /scrape           - Déclencher un scrape")
     print("  GET  /status           - Status du scrape en cours")
+    print("  GET  /status/stream    - Logs en temps réel (SSE)")
     print("  GET  /health           - Health check")
     print("  POST /register-device  - Enregistrer device pour push")
     print("  POST /test-notification - Tester les notifications")
@@ -600,5 +916,6 @@ if __name__ == '__main__':
     print('  curl http://localhost:5001/status')
     print("\n" + "="*60 + "\n")
     
+    # Serveur de dev uniquement: en production, gunicorn (gthread, voir Procfile) sert `api_server:app`
     port = int(os.environ.get('PORT', 5001))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -9,19 +9,46 @@ Ce script:
 4. Lance l'analyse IA
 5. Sauvegarde les opportunités
 6. Envoie une notification (optionnel)
+
+Usage:
+    python auto_scrape.py
+    python auto_scrape.py --debug   # Garde aussi les données brutes (.tmp/auto_scrape_*.json)
+    LOG_LEVEL=DEBUG python auto_scrape.py   # Affiche aussi les champs des premiers items Apify
 """
 
-import json
+import logging
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain, count, islice
 from pathlib import Path
+from typing import Iterable, Optional
 from dotenv import load_dotenv
 
+from json_utils import dumps_json, loads_json
+
 # Charger les variables d'environnement
 load_dotenv()
 
+# Nombre maximum de runs Apify lancés en parallèle (un run par groupe, limite du compte Apify)
+APIFY_MAX_CONCURRENT_RUNS = int(os.getenv('APIFY_MAX_CONCURRENT_RUNS', '5'))
+
+# Envoi Supabase par lots (SUPABASE_BATCHING=1): seulement si l'Edge Function rattache les lots
+# suivants via session_id, sinon chaque lot crée sa propre session. Par défaut: un seul POST
+SUPABASE_BATCHING = os.getenv('SUPABASE_BATCHING', '0').lower() in ('1', 'true', 'yes')
+
+# Logs de diagnostic (LOG_LEVEL=DEBUG pour les afficher, sinon rien n'est formaté)
+logger = logging.getLogger(__name__)
+logger.setLevel(getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO))
+if not logger.handlers:
+    log_handler = logging.StreamHandler(sys.stdout)
+    log_handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(log_handler)
+    logger.propagate = False
+
 # Couleurs ANSI
 class Colors:
     HEADER = '\033[95m'
@@ -34,20 +61,54 @@ class Colors:
     END = '\033[0m'
 
 
+# Pas de codes ANSI quand la sortie est redirigée (scheduler, cron, logs) ou si NO_COLOR est défini
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for name in [name for name in vars(Colors) if name.isupper()]:
+        setattr(Colors, name, '')
+
+
+CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'groups.json'
+
+
+@lru_cache(maxsize=1)
+def read_config(mtime_ns: int) -> dict:
+    """Parse groups.json (une entrée de cache par version du fichier)"""
+    return loads_json(CONFIG_PATH.read_bytes())
+
+
 def load_config():
-    """Charge la configuration des groupes"""
-    config_path = Path(__file__).parent.parent / 'config' / 'groups.json'
-    
-    if not config_path.exists():
+    """Charge la configuration des groupes (relue seulement si groups.json a changé)"""
+    try:
+        mtime_ns = CONFIG_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
         print(f"{Colors.RED}❌ Fichier config/groups.json non trouvé{Colors.END}")
         sys.exit(1)
     
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_config(mtime_ns)
+
+
+def run_group_scrape(client, url: str, posts_per_group: int) -> Optional[str]:
+    """Lance un run Apify pour un groupe et retourne l'id de son dataset (None en cas d'erreur)"""
+    # Configuration de l'Actor (paramètres selon doc API Apify)
+    run_input = {
+        "startUrls": [{"url": url}],
+        "resultsLimit": posts_per_group,  # Limite le nombre de posts du groupe
+        "sort": "recent"
+    }
+    try:
+        # Utiliser facebook-groups-scraper (confirmé par l'utilisateur)
+        run = client.actor("apify/facebook-groups-scraper").call(run_input=run_input)
+    except Exception as e:
+        print(f"{Colors.RED}❌ Erreur Apify ({url}): {e}{Colors.END}")
+        return None
+    return run["defaultDatasetId"]
 
 
-def run_apify_scrape(groups: list, posts_per_group: int = 50):
-    """Lance le scraping via Apify"""
+def run_apify_scrape(groups: list, posts_per_group: int = 50, urls: Optional[list] = None):
+    """
+    Lance le scraping via Apify et retourne (itérateur sur les items des datasets, nombre de runs réussis).
+    L'itérateur vaut None si aucun run n'a abouti.
+    """
     try:
         from apify_client import ApifyClient
     except ImportError:
@@ -62,7 +123,8 @@ def run_apify_scrape(groups: list, posts_per_group: int = 50):
     client = ApifyClient(token)
     
     # Préparer les URLs
-    start_urls = [{"url": g["url"]} for g in groups]
+    if urls is None:
+        urls = [g["url"] for g in groups]
     
     print(f"\n{Colors.CYAN}📡 Lancement du scraping Apify...{Colors.END}")
     print(f"   Groupes: {len(groups)}")
@@ -71,127 +133,224 @@ def run_apify_scrape(groups: list, posts_per_group: int = 50):
     for g in groups:
         print(f"   • {g['name']}")
     
-    # Configuration de l'Actor (paramètres selon doc API Apify)
-    run_input = {
-        "startUrls": start_urls,
-        "resultsLimit": posts_per_group,  # Limite le nombre total de posts
-        "sort": "recent"
-    }
-    
-    # Lancer l'Actor
+    # Un run par groupe, en parallèle: la durée totale est celle du groupe le plus lent
+    # (facturation au résultat, seul le démarrage de run est payé en plus par groupe)
     print(f"\n{Colors.YELLOW}⏳ Scraping en cours...{Colors.END}")
+    if not urls:
+        return None, 0
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), APIFY_MAX_CONCURRENT_RUNS))) as pool:
+        dataset_ids = list(pool.map(lambda url: run_group_scrape(client, url, posts_per_group), urls))
     
-    try:
-        # Utiliser facebook-groups-scraper (confirmé par l'utilisateur)
-        run = client.actor("apify/facebook-groups-scraper").call(run_input=run_input)
-    except Exception as e:
-        print(f"{Colors.RED}❌ Erreur Apify: {e}{Colors.END}")
-        return None
+    dataset_ids = [dataset_id for dataset_id in dataset_ids if dataset_id is not None]
+    if not dataset_ids:
+        return None, 0
     
     # Récupérer les résultats
     print(f"{Colors.GREEN}✅ Scraping terminé!{Colors.END}")
     
-    items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-    print(f"   Posts récupérés: {len(items)}")
-    
-    return items
+    # Items lus page par page pendant la transformation (pas de liste complète en mémoire)
+    items = chain.from_iterable(client.dataset(dataset_id).iterate_items() for dataset_id in dataset_ids)
+    return items, len(dataset_ids)
+
+
+def apify_item_to_post(item: dict, text: str, captured_at: str) -> dict:
+    """Convertit un item Apify (déjà filtré sur son texte) en post au format standard"""
+    get = item.get
+    # Mapper selon les champs de la doc Apify:
+    # postText, postUrl, profileName, profileId, likesCount, commentsCount, time, topComments
+    # Les replis ne sont évalués (et `{}` alloué) que si le champ principal manque
+    post_id = get('facebookId') or get('id') or ''
+    media = get('media')
+    return {
+        "id": f"apify_{post_id}",
+        "postId": post_id,
+        "author": get('profileName') or (get('user') or {}).get('name', 'Inconnu'),
+        "authorProfileUrl": get('profileUrl') or (get('user') or {}).get('url', ''),
+        "timestamp": get('time', ''),
+        "text": text,
+        "postUrl": get('postUrl') or get('url', ''),
+        "hasMedia": bool(media),
+        "mediaType": media[0].get('type') if isinstance(media, list) and media else None,
+        "source": "apify",
+        "capturedAt": captured_at,
+        # Un compteur à 0 est une vraie valeur: repli seulement si le champ est absent
+        "likesCount": likes if (likes := get('likesCount')) is not None else get('likes', 0),
+        "commentsCount": comments if (comments := get('commentsCount')) is not None else get('comments', 0),
+        "sharesCount": shares if (shares := get('sharesCount')) is not None else get('shares', 0),
+        "topComments": (get('topComments') or [])[:3]
+    }
 
 
-def transform_apify_data(items: list, groups: list) -> dict:
-    """Transforme les données Apify en format standard"""
+def transform_apify_data(items: Iterable[dict], groups: list, group_names: Optional[list] = None, group_urls: Optional[list] = None) -> dict:
+    """Transforme les données Apify (liste ou itérateur) en format standard
+
+    group_names / group_urls: listes déjà calculées par l'appelant (sinon dérivées de `groups`)
+    """
+    items = iter(items)
+    # Debug: afficher ce qu'on reçoit d'Apify (seulement avec LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        first_items = list(islice(items, 3))  # Afficher les 3 premiers
+        items = chain(first_items, items)
+        logger.debug("\n🔍 DEBUG: premiers items Apify reçus")
+        for i, item in enumerate(first_items):
+            logger.debug(f"   Item {i+1}: {list(item.keys())[:8]}...")
+            # Selon la doc Apify, le champ est "postText"
+            if 'postText' in item:
+                text_preview = item['postText'][:50] if item['postText'] else "(vide)"
+                logger.debug(f"      postText: {text_preview}...")
+            elif 'text' in item:
+                text_preview = item['text'][:50] if item['text'] else "(vide)"
+                logger.debug(f"      text: {text_preview}...")
+            else:
+                logger.debug("      ⚠️ Ni 'postText' ni 'text' trouvé dans les clés")
+    
+    # Les posts sans texte et les doublons (même id, fréquents entre pages Apify) sont écartés
+    # avant de construire leur dict: pas d'analyse IA payée deux fois pour le même post.
+    # zip avec un compteur pour connaître le nombre d'items reçus sans garder la liste
+    received = count()
+    captured_at = datetime.now().isoformat()  # Même horodatage pour tous les posts du run
+    seen_ids = set()
+    duplicates = 0
     posts = []
-    
-    # Debug: afficher ce qu'on reçoit d'Apify
-    print(f"\n{Colors.YELLOW}🔍 DEBUG: Apify items reçus: {len(items)}{Colors.END}")
-    for i, item in enumerate(items[:3]):  # Afficher les 3 premiers
-        print(f"   Item {i+1}: {list(item.keys())[:8]}...")
-        # Selon la doc Apify, le champ est "postText"
-        if 'postText' in item:
-            text_preview = item['postText'][:50] if item['postText'] else "(vide)"
-            print(f"      postText: {text_preview}...")
-        elif 'text' in item:
-            text_preview = item['text'][:50] if item['text'] else "(vide)"
-            print(f"      text: {text_preview}...")
-        else:
-            print(f"      ⚠️ Ni 'postText' ni 'text' trouvé dans les clés")
-    
-    for item in items:
-        # Mapper selon les champs de la doc Apify:
-        # postText, postUrl, profileName, profileId, likesCount, commentsCount, time, topComments
-        post = {
-            "id": f"apify_{item.get('facebookId', item.get('id', ''))}",
-            "postId": item.get('facebookId', item.get('id', '')),
-            "author": item.get('profileName', item.get('user', {}).get('name', 'Inconnu')),
-            "authorProfileUrl": item.get('profileUrl', item.get('user', {}).get('url', '')),
-            "timestamp": item.get('time', ''),
-            "text": item.get('postText', item.get('text', item.get('message', ''))),
-            "postUrl": item.get('postUrl', item.get('url', '')),
-            "hasMedia": bool(item.get('media')),
-            "mediaType": item.get('media', [{}])[0].get('type') if item.get('media') else None,
-            "source": "apify",
-            "capturedAt": datetime.now().isoformat(),
-            "likesCount": item.get('likesCount', item.get('likes', 0)),
-            "commentsCount": item.get('commentsCount', item.get('comments', 0)),
-            "sharesCount": item.get('sharesCount', item.get('shares', 0)),
-            "topComments": item.get('topComments', [])[:3] if item.get('topComments') else []
-        }
-        
-        if post['text']:  # Ne garder que les posts avec du texte
-            posts.append(post)
-    
-    # Extraire les noms de groupes
-    group_names = [g['name'] for g in groups]
+    for item, _ in zip(items, received):
+        text = item.get('postText') or item.get('text') or item.get('message')
+        if not text:
+            continue
+        post_id = item.get('facebookId') or item.get('id')
+        if post_id:
+            if post_id in seen_ids:
+                duplicates += 1
+                continue
+            seen_ids.add(post_id)
+        posts.append(apify_item_to_post(item, text, captured_at))
+    
+    if duplicates:
+        print(f"   🔁 {duplicates} post(s) en double ignoré(s)")
+    
+    # Noms et URLs des groupes, si l'appelant ne les a pas déjà calculés
+    if group_names is None:
+        group_names = [g['name'] for g in groups]
+    if group_urls is None:
+        group_urls = [g['url'] for g in groups]
     
     return {
         "extractedAt": datetime.now().isoformat(),
-        "groupUrls": [g['url'] for g in groups],
+        "groupUrls": group_urls,
         "groupNames": group_names,
+        "itemsCount": next(received),  # Items reçus d'Apify, avant filtrage (base du coût)
         "postsCount": len(posts),
         "source": "apify-auto",
         "posts": posts
     }
 
 
-def run_ai_analysis(json_file: Path):
-    """Lance l'analyse IA sur les posts"""
+def run_ai_analysis(json_file: Path, data: Optional[dict] = None, source_saved: bool = True) -> Optional[dict]:
+    """Lance l'analyse IA sur les posts et retourne ses résultats (None en cas d'échec)
+
+    source_saved: False si `json_file` n'a pas été écrit (les résultats n'y font alors pas référence)
+    """
     print(f"\n{Colors.CYAN}🤖 Lancement de l'analyse IA...{Colors.END}")
     
-    # Importer et exécuter le script d'analyse
-    import subprocess
-    result = subprocess.run(
-        [sys.executable, str(Path(__file__).parent / 'analyze_posts_ai.py'), str(json_file)],
-        capture_output=True,
-        text=True
-    )
+    # Analyse dans ce processus (pas de nouvel interpréteur ni de relecture du JSON)
+    from analyze_posts_ai import analyze_posts_with_ai, load_posts, save_results
     
-    print(result.stdout)
-    if result.stderr:
-        print(result.stderr)
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        print(f"{Colors.RED}❌ OPENAI_API_KEY non trouvée dans .env{Colors.END}")
+        return None
     
-    return result.returncode == 0
+    try:
+        if data is None:
+            data = load_posts(json_file)
+        opportunities = analyze_posts_with_ai(data, api_key)
+        # Résultats écrits à côté du fichier analysé, comme analyze_posts_ai.py
+        return save_results(data, opportunities, json_file, source_saved)
+    except Exception as e:
+        print(f"{Colors.RED}❌ Erreur analyse IA: {e}{Colors.END}")
+        return None
 
 
-def calculate_apify_cost(total_posts: int, use_date_filter: bool = True) -> float:
+def calculate_apify_cost(total_posts: int, use_date_filter: bool = True, runs: int = 1) -> float:
     """
     Calcule le coût Apify basé sur le pricing Starter plan:
     - Posts: $4.00 / 1,000
     - Date filter add-on: $1.00 / 1,000
-    - Actor start: $0.005 (one-time)
+    - Actor start: $0.005 (par run réussi, un run par groupe)
     """
-    cost_posts = (total_posts / 1000) * 4.00
-    cost_date_filter = (total_posts / 1000) * 1.00 if use_date_filter else 0
-    cost_actor_start = 0.005
-    
-    total_cost = cost_posts + cost_date_filter + cost_actor_start
-    return round(total_cost, 4)
+    # Tarifs repliés par post: $0.004 (posts) + $0.001 (date filter) = $0.005
+    cost_per_post = 0.005 if use_date_filter else 0.004
+    return round(total_posts * cost_per_post + 0.005 * runs, 4)
 
 
-def send_to_supabase(opportunities: list, groups_scraped: list = None, started_at: str = None, cost: float = None) -> bool:
-    """Envoie les opportunités à Supabase via Edge Function webhook"""
+SUPABASE_WEBHOOK_URL = "https://axkfgpsadfgadbqtfhlf.supabase.co/functions/v1/ingest-opportunity"
+SUPABASE_BATCH_SIZE = 10  # Opportunités par POST si SUPABASE_BATCHING (les gros payloads font échouer l'Edge Function)
+SUPABASE_MAX_WORKERS = 4  # Lots envoyés en parallèle
+
+# Session HTTP partagée (connexions réutilisées entre les envois), créée au premier appel
+http_session = None
+
+
+def get_http_session():
+    """Session requests avec pool de connexions et retries sur les erreurs transitoires"""
+    global http_session
+    if http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # POST non idempotent: on ne rejoue que si le webhook n'a pas pu traiter la requête
+        # (connexion refusée, 429, 503). Pas de 500/502/504 ni de timeout de lecture:
+        # l'Edge Function a pu créer la session avant que la réponse ne se perde
+        retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 503],
+            allowed_methods=['POST'],
+            raise_on_status=False  # La dernière réponse est traitée normalement
+        )
+        http_session = requests.Session()
+        http_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry))
+    return http_session
+
+
+def post_opportunities_batch(payload: dict, batch_index: int, batch_count: int) -> Optional[dict]:
+    """Envoie un lot d'opportunités au webhook et retourne sa réponse JSON (None en cas d'échec)"""
     import requests
     
-    WEBHOOK_URL = "https://axkfgpsadfgadbqtfhlf.supabase.co/functions/v1/ingest-opportunity"
+    label = f" (lot {batch_index + 1}/{batch_count})" if batch_count > 1 else ""
+    try:
+        response = get_http_session().post(
+            SUPABASE_WEBHOOK_URL,
+            json=payload,
+            headers={
+                "Content-Type": "application/json",
+                # Permet à l'Edge Function de regrouper / dédupliquer les lots d'une même session
+                "X-Batch-Index": str(batch_index),
+                "X-Batch-Count": str(batch_count)
+            },
+            timeout=30
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"{Colors.RED}❌ Erreur connexion Supabase{label}: {e}{Colors.END}")
+        return None
+    
+    if response.status_code != 200:
+        print(f"{Colors.RED}❌ Erreur Supabase ({response.status_code}){label}: {response.text}{Colors.END}")
+        return None
+    return response.json()
+
+
+def send_to_supabase(opportunities: list, groups_scraped: list = None, started_at: str = None, cost: float = None) -> bool:
+    """
+    Envoie les opportunités à Supabase via Edge Function webhook: un seul POST, ou des lots
+    de SUPABASE_BATCH_SIZE si SUPABASE_BATCHING est activé.
     
+    Contrat avec l'Edge Function ingest-opportunity (mode par lots):
+    - le premier lot crée la session (avec le coût) et la réponse renvoie son `session_id`
+    - les lots suivants portent ce `session_id` (sans `cost`) et doivent être rattachés
+      à la session existante au lieu d'en créer une nouvelle
+    """
     if not opportunities:
         print(f"{Colors.YELLOW}⚠️ Aucune opportunité à envoyer à Supabase{Colors.END}")
         return True
@@ -201,7 +360,6 @@ def send_to_supabase(opportunities: list, groups_scraped: list = None, started_a
     # Construire le payload avec les infos de session
     today = datetime.now().strftime('%d %b')
     num_groups = len(groups_scraped) if groups_scraped else 0
-    num_opps = len(opportunities)
     
     # Titre court et descriptif
     if num_groups == 1:
@@ -212,32 +370,37 @@ def send_to_supabase(opportunities: list, groups_scraped: list = None, started_a
     payload = {
         "session_title": session_title,
         "groups_scraped": groups_scraped or [],
-        "started_at": started_at or datetime.now().isoformat(),
-        "opportunities": opportunities,
-        "cost": cost  # Coût Apify calculé
+        "started_at": started_at or datetime.now().isoformat()
     }
+    if SUPABASE_BATCHING:
+        batches = [opportunities[i:i + SUPABASE_BATCH_SIZE] for i in range(0, len(opportunities), SUPABASE_BATCH_SIZE)]
+    else:
+        batches = [opportunities]
     
-    try:
-        response = requests.post(
-            WEBHOOK_URL,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            print(f"{Colors.GREEN}✅ Supabase: {result.get('message', 'Success')}{Colors.END}")
-            if result.get('session_id'):
-                print(f"   Session ID: {result.get('session_id')}")
-            return True
-        else:
-            print(f"{Colors.RED}❌ Erreur Supabase ({response.status_code}): {response.text}{Colors.END}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"{Colors.RED}❌ Erreur connexion Supabase: {e}{Colors.END}")
+    # Le premier lot crée la session: seul lui porte le coût Apify (sinon compté une fois par lot)
+    result = post_opportunities_batch({**payload, "cost": cost, "opportunities": batches[0]}, 0, len(batches))
+    if result is None:
         return False
+    print(f"{Colors.GREEN}✅ Supabase: {result.get('message', 'Success')}{Colors.END}")
+    if result.get('session_id'):
+        print(f"   Session ID: {result.get('session_id')}")
+        payload["session_id"] = result['session_id']
+    elif len(batches) > 1:
+        print(f"{Colors.YELLOW}⚠️ Pas de session_id renvoyé: les lots suivants ne seront pas rattachés à la session{Colors.END}")
+    
+    if len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=SUPABASE_MAX_WORKERS) as pool:
+            results = list(pool.map(
+                lambda indexed: post_opportunities_batch({**payload, "opportunities": indexed[1]}, indexed[0], len(batches)),
+                enumerate(batches[1:], 1)
+            ))
+        failed = results.count(None)
+        if failed:
+            print(f"{Colors.RED}❌ {failed}/{len(batches)} lot(s) non envoyé(s) à Supabase{Colors.END}")
+            return False
+        print(f"{Colors.GREEN}✅ Supabase: {len(batches)} lots envoyés{Colors.END}")
+    
+    return True
 
 
 def send_notification(opportunities: list, total_posts: int, groups_scraped: list = None, started_at: str = None, cost: float = None):
@@ -258,16 +421,26 @@ def send_notification(opportunities: list, total_posts: int, groups_scraped: lis
             summary = opp.get('ai_analysis', {}).get('summary', '')[:60]
             print(f"   {i}. [{category}] {summary}...")
         
-        # Envoyer à Supabase avec les infos de session et le coût
-        send_to_supabase(opportunities, groups_scraped=groups_scraped, started_at=started_at, cost=cost)
-    
-    # TODO: Ajouter ici l'envoi par email/Slack/SMS
-    # - Email: via smtplib ou SendGrid
-    # - Slack: via webhook
-    # - SMS: via Twilio
+        # Envoyer à tous les canaux en parallèle (Supabase avec les infos de session et le coût)
+        with ThreadPoolExecutor(max_workers=len(NOTIFIERS)) as pool:
+            futures = [
+                pool.submit(notifier, opportunities, groups_scraped=groups_scraped, started_at=started_at, cost=cost)
+                for notifier in NOTIFIERS
+            ]
+        for future in futures:
+            if future.exception() is not None:
+                print(f"{Colors.RED}❌ Erreur notification: {future.exception()}{Colors.END}")
+
 
+# Canaux de notification, appelés en parallèle avec (opportunities, groups_scraped=, started_at=, cost=)
+# TODO: Ajouter ici l'envoi par email/Slack/SMS
+# - Email: via smtplib ou SendGrid
+# - Slack: via webhook (get_http_session() pour réutiliser les connexions)
+# - SMS: via Twilio
+NOTIFIERS = [send_to_supabase]
 
-def main():
+
+def main(debug: bool = False):
     print(f"\n{Colors.HEADER}{'='*60}{Colors.END}")
     print(f"{Colors.BOLD}🚀 AUTO-SCRAPE FACEBOOK GROUPS{Colors.END}")
     print(f"{Colors.HEADER}{'='*60}{Colors.END}")
@@ -286,54 +459,50 @@ def main():
         print(f"{Colors.RED}❌ Aucun groupe configuré dans config/groups.json{Colors.END}")
         sys.exit(1)
     
-    # Extraire les noms des groupes pour la session
+    # Noms et URLs des groupes calculés une seule fois pour tout le run
     group_names = [g['name'] for g in groups]
+    group_urls = [g['url'] for g in groups]
     print(f"\n{Colors.CYAN}Groupes configurés:{Colors.END} {len(groups)}")
     
     # 2. Lancer le scraping
-    items = run_apify_scrape(groups, posts_per_group)
+    items, apify_runs = run_apify_scrape(groups, posts_per_group, urls=group_urls)
+    
+    # 3. Transformer les données au fil de la lecture du dataset (gardées en mémoire pour l'analyse IA)
+    data = transform_apify_data(items or [], groups, group_names=group_names, group_urls=group_urls)
     
-    if not items:
+    if not data['itemsCount']:
         print(f"{Colors.YELLOW}⚠️ Aucun post récupéré{Colors.END}")
         sys.exit(1)
+    print(f"   Posts récupérés: {data['itemsCount']}")
     
     # Calculer le coût Apify basé sur le nombre TOTAL de posts scrapés
-    total_posts_scraped = len(items)
-    apify_cost = calculate_apify_cost(total_posts_scraped, use_date_filter=True)
+    total_posts_scraped = data['itemsCount']
+    apify_cost = calculate_apify_cost(total_posts_scraped, use_date_filter=True, runs=apify_runs)
     print(f"\n{Colors.YELLOW}💰 Coût Apify estimé: ${apify_cost:.4f} USD ({total_posts_scraped} posts){Colors.END}")
     
-    # 3. Transformer et sauvegarder les données
-    data = transform_apify_data(items, groups)
-    
     timestamp = datetime.now().strftime('%Y-%m-%dT%H-%M-%S')
     output_dir = Path(__file__).parent.parent / '.tmp'
     output_dir.mkdir(exist_ok=True)
     
     output_file = output_dir / f'auto_scrape_{timestamp}.json'
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    print(f"\n{Colors.GREEN}✅ Données sauvegardées: {output_file}{Colors.END}")
+    # Les données brutes ne sont écrites qu'en mode debug: seul le résultat analysé est archivé
+    if debug:
+        output_file.write_bytes(dumps_json(data))
+        print(f"\n{Colors.GREEN}✅ Données sauvegardées: {output_file}{Colors.END}")
     
     # 4. Lancer l'analyse IA
-    success = run_ai_analysis(output_file)
-    
-    if success:
-        # Charger les résultats de l'analyse
-        analyzed_file = output_dir / f'ai_analyzed_auto_scrape_{timestamp}.json'
-        if analyzed_file.exists():
-            with open(analyzed_file, 'r', encoding='utf-8') as f:
-                results = json.load(f)
-            
-            opportunities = results.get('opportunities', [])
-            send_notification(opportunities, data['postsCount'], groups_scraped=group_names, started_at=started_at, cost=apify_cost)
+    results = run_ai_analysis(output_file, data, source_saved=debug)
+    
+    if results is not None:
+        opportunities = results.get('opportunities', [])
+        send_notification(opportunities, data['postsCount'], groups_scraped=group_names, started_at=started_at, cost=apify_cost)
     
     print(f"\n{Colors.GREEN}✅ Auto-scrape terminé!{Colors.END}\n")
 
 
 if __name__ == '__main__':
-    main()
+    main(debug='--debug' in sys.argv[1:])
 
 
 
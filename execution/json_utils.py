@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Sérialisation JSON partagée par les scripts d'exécution.
+Utilise orjson si disponible, sinon le module json standard.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Repli sur json (pip install orjson)
+
+
+def dumps_json(data) -> bytes:
+    """Sérialise en JSON indenté (UTF-8), avec orjson si disponible"""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: clés int/float acceptées comme avec json.dumps
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def loads_json(raw: bytes):
+    """Parse du JSON (bytes), avec orjson si disponible"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
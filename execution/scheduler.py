@@ -11,16 +11,26 @@ Usage:
     python scheduler.py --test   # Mode test (vérifie la config sans scraper)
 """
 
+import sched
 import sys
 import time
-import schedule
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Ajouter le répertoire parent au path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from auto_scrape import main as run_scrape
+# Heures de scraping (heure locale)
+SCHEDULE_TIMES = [(12, 0), (19, 0)]
+
+# Attente maximale entre deux vérifications du planning (secondes)
+MAX_IDLE_SECONDS = 15 * 60
+
+
+def run_scrape():
+    """Lance un scraping complet (auto_scrape importé seulement ici: --test reste rapide)"""
+    from auto_scrape import main
+    main()
 
 
 def job():
@@ -35,23 +45,39 @@ def job():
         print(f"❌ Erreur lors du scraping: {e}")
 
 
+def next_run_time(hour: int, minute: int) -> float:
+    """Timestamp du prochain hh:mm (aujourd'hui si pas encore passé, sinon demain)"""
+    now = datetime.now()
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at.timestamp()
+
+
+def run_and_reschedule(scheduler: sched.scheduler, hour: int, minute: int):
+    """Lance le job puis le replanifie pour le lendemain à la même heure"""
+    job()
+    scheduler.enterabs(next_run_time(hour, minute), 1, run_and_reschedule, (scheduler, hour, minute))
+
+
 def run_scheduler():
     """Lance le scheduler qui tourne en continu"""
     print("\n🕐 Scheduler démarré!")
     print("   Scraping planifié à: 12:00 et 19:00")
     print("   Ctrl+C pour arrêter\n")
     
-    # Planifier les jobs
-    schedule.every().day.at("12:00").do(job)
-    schedule.every().day.at("19:00").do(job)
+    # Planifier les jobs (file à priorité de la stdlib, chaque job se replanifie après son exécution)
+    # L'attente est plafonnée pour rester juste si l'horloge système est ajustée pendant l'attente:
+    # sched revérifie l'heure du prochain job à chaque réveil
+    scheduler = sched.scheduler(time.time, lambda delay: time.sleep(min(delay, MAX_IDLE_SECONDS)))
+    for hour, minute in SCHEDULE_TIMES:
+        scheduler.enterabs(next_run_time(hour, minute), 1, run_and_reschedule, (scheduler, hour, minute))
     
     # Afficher le prochain run
-    print(f"   Prochain scraping: {schedule.next_run()}")
+    print(f"   Prochain scraping: {datetime.fromtimestamp(scheduler.queue[0].time)}")
     
-    # Boucle principale
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Vérifier chaque minute
+    # Boucle principale: dort jusqu'au prochain job au lieu de vérifier chaque minute
+    scheduler.run()
 
 
 def main():
@@ -11,11 +11,13 @@ Usage:
 
 import os
 import sys
-import json
 import time
 import argparse
 from datetime import datetime
 from pathlib import Path
+from typing import Iterable, Iterator
+
+from json_utils import dumps_json
 
 # Ajouter le dossier parent au path pour les imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -40,7 +42,7 @@ DEFAULT_LIMIT = 50
 OUTPUT_DIR = Path(__file__).parent.parent / ".tmp"
 
 
-def scrape_facebook_group(group_url: str, limit: int = 50, sort: str = "recent") -> list:
+def scrape_facebook_group(group_url: str, limit: int = 50, sort: str = "recent") -> Iterator[dict]:
     """
     Scrape un groupe Facebook via Apify
     
@@ -50,7 +52,7 @@ def scrape_facebook_group(group_url: str, limit: int = 50, sort: str = "recent")
         sort: 'recent', 'relevant', ou 'activity'
     
     Returns:
-        Liste des posts
+        Itérateur sur les posts (lus page par page depuis le dataset)
     """
     if not APIFY_TOKEN:
         print("❌ APIFY_TOKEN non configuré!")
@@ -83,23 +85,21 @@ def scrape_facebook_group(group_url: str, limit: int = 50, sort: str = "recent")
     # Lancer le scraper
     run = client.actor("apify/facebook-groups-scraper").call(run_input=run_input)
     
-    # Récupérer les résultats
+    # Récupérer les résultats (consommés directement par convert_to_standard_format)
     print("📥 Récupération des résultats...")
-    items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-    
-    print(f"✅ {len(items)} posts récupérés!")
-    print()
-    
-    return items
+    return client.dataset(run["defaultDatasetId"]).iterate_items()
 
 
-def convert_to_standard_format(apify_posts: list, group_url: str) -> dict:
+def convert_to_standard_format(apify_posts: Iterable[dict], group_url: str) -> dict:
     """
     Convertit les posts Apify au format standard de notre extension
     """
     posts = []
+    items_count = 0
+    captured_at = datetime.now().isoformat()  # Même horodatage pour tous les posts du run
     
     for item in apify_posts:
+        items_count += 1
         post = {
             "id": f"apify_{item.get('postId', '')}",
             "postId": item.get('postId', ''),
@@ -111,7 +111,7 @@ def convert_to_standard_format(apify_posts: list, group_url: str) -> dict:
             "hasMedia": bool(item.get('media') or item.get('imageUrls') or item.get('videoUrl')),
             "mediaType": "video" if item.get('videoUrl') else ("image" if item.get('imageUrls') else None),
             "source": "apify",
-            "capturedAt": datetime.now().isoformat(),
+            "capturedAt": captured_at,
             # Données supplémentaires d'Apify
             "likesCount": item.get('likesCount', 0),
             "commentsCount": item.get('commentsCount', 0),
@@ -124,14 +124,14 @@ def convert_to_standard_format(apify_posts: list, group_url: str) -> dict:
             posts.append(post)
     
     # Extraire le nom du groupe depuis l'URL
-    group_name = "Unknown Group"
-    if "/groups/" in group_url:
-        group_name = group_url.split("/groups/")[-1].rstrip("/").replace("-", " ").title()
+    _, found, slug = group_url.rpartition("/groups/")
+    group_name = (found and slug.rstrip("/").replace("-", " ").title()) or "Unknown Group"
     
     return {
         "extractedAt": datetime.now().isoformat(),
         "groupUrl": group_url,
         "groupName": group_name,
+        "itemsCount": items_count,  # Items reçus d'Apify, avant filtrage
         "postsCount": len(posts),
         "source": "apify",
         "posts": posts
@@ -146,8 +146,7 @@ def save_results(data: dict, output_dir: Path) -> Path:
     filename = f"facebook_posts_apify_{timestamp}.json"
     filepath = output_dir / filename
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    filepath.write_bytes(dumps_json(data))
     
     print(f"💾 Résultats sauvegardés: {filepath}")
     return filepath
@@ -220,12 +219,15 @@ def main():
         sort=args.sort
     )
     
-    if not apify_posts:
+    # Convertir au format standard (au fil de la lecture du dataset)
+    data = convert_to_standard_format(apify_posts, args.group)
+    
+    if not data["itemsCount"]:
         print("❌ Aucun post récupéré")
         sys.exit(1)
     
-    # Convertir au format standard
-    data = convert_to_standard_format(apify_posts, args.group)
+    print(f"✅ {data['itemsCount']} posts récupérés!")
+    print()
     
     # Afficher un aperçu
     print("📊 Aperçu des posts:")